@@ -0,0 +1,260 @@
+"""
+Barcha filiallar bo'yicha umumiy analitika (admin: /admin/analytics).
+
+Sahifa faqat kichik, oldindan hisoblangan jadvallardan o'qiydi — yuklanish vaqti
+skanlar soniga bog'liq emas:
+  * `scan_daily_stats`    — language_views ning kun × mahsulot × til yig'indisi.
+                            Inkremental: faqat `analytics_state.last_view_id` dan
+                            keyingi skanlar qo'shiladi (INSERT … SELECT … ON CONFLICT);
+  * `branch_scan_summary` — filial bo'yicha jami / bugun / 7 / 30 kun, til ulushi,
+                            haftalik o'sish;
+  * `top_product_summary` — tarmoq bo'yicha top mahsulotlar (oxirgi 7 kun).
+Oxirgi ikkitasi har yangilashda `scan_daily_stats` dan qayta quriladi.
+
+Yangilash:
+    flask analytics refresh          (cron / systemd timer uchun)
+    ANALYTICS_REFRESH_SECONDS=300    (har bir workerda fon oqimi)
+yoki sahifadagi "Yangilash" tugmasi. Bir vaqtda ishga tushgan yangilashlardan
+faqat bittasi ishlaydi (`analytics_state.runs` bo'yicha shartli UPDATE).
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import Blueprint, render_template, redirect, url_for, flash
+from sqlalchemy import select, update, delete, func, case
+from sqlalchemy.dialects import postgresql, sqlite
+
+from auth import admin_required
+from models import (
+    db, Branch, Product, LanguageView,
+    ScanDailyStat, BranchScanSummary, TopProductSummary, AnalyticsState,
+)
+
+logger = logging.getLogger(__name__)
+
+analytics_bp = Blueprint('analytics', __name__)
+
+REFRESH_SECONDS = int(os.getenv("ANALYTICS_REFRESH_SECONDS", 0))
+# Hali commit qilinmagan (kichikroq id li) skanlar o'tkazib yuborilmasligi uchun
+SETTLE_SECONDS = int(os.getenv("ANALYTICS_SETTLE_SECONDS", 60))
+VIEW_BATCH = 200_000
+TOP_N = 20
+LANGS = ["uz", "ru", "en"]
+
+DIALECT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def _upsert_daily(first_id, last_id):
+    """(first_id, last_id] oralig'idagi skanlarni scan_daily_stats ga qo'shadi."""
+    table = ScanDailyStat.__table__
+    source = (
+        select(
+            func.date(LanguageView.created_at), LanguageView.product_id, LanguageView.lang,
+            Product.branch_id, func.count(),
+        )
+        .join(Product, Product.id == LanguageView.product_id)
+        .where(LanguageView.id > first_id, LanguageView.id <= last_id, LanguageView.created_at.isnot(None))
+        .group_by(func.date(LanguageView.created_at), LanguageView.product_id, LanguageView.lang, Product.branch_id)
+    )
+    insert = DIALECT_INSERTS[db.engine.dialect.name]
+    stmt = insert(table).from_select(["day", "product_id", "lang", "branch_id", "scans"], source)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["day", "product_id", "lang"],
+        set_={"scans": table.c.scans + stmt.excluded.scans},
+    )
+    db.session.execute(stmt)
+
+
+def _rebuild_summaries(today):
+    day = ScanDailyStat.day
+    scans = ScanDailyStat.scans
+
+    def scans_since(start, end=None):
+        cond = day > start if end is None else (day > start) & (day <= end)
+        return func.coalesce(func.sum(case((cond, scans), else_=0)), 0)
+
+    week_ago, two_weeks_ago = today - timedelta(days=7), today - timedelta(days=14)
+
+    db.session.execute(delete(BranchScanSummary))
+    db.session.execute(
+        BranchScanSummary.__table__.insert().from_select(
+            ["branch_id", "total", "today", "last_7d", "prev_7d", "last_30d", *LANGS],
+            select(
+                ScanDailyStat.branch_id,
+                func.sum(scans),
+                scans_since(today - timedelta(days=1)),
+                scans_since(week_ago),
+                scans_since(two_weeks_ago, week_ago),
+                scans_since(today - timedelta(days=30)),
+                *[func.coalesce(func.sum(case((ScanDailyStat.lang == lang, scans), else_=0)), 0) for lang in LANGS],
+            )
+            .join(Branch, Branch.id == ScanDailyStat.branch_id)
+            .group_by(ScanDailyStat.branch_id)
+        )
+    )
+
+    last_7d = scans_since(week_ago).label("last_7d")
+    top = db.session.execute(
+        select(ScanDailyStat.product_id, ScanDailyStat.branch_id, last_7d, scans_since(two_weeks_ago, week_ago))
+        .join(Product, Product.id == ScanDailyStat.product_id)
+        .where(day > two_weeks_ago)
+        .group_by(ScanDailyStat.product_id, ScanDailyStat.branch_id)
+        .order_by(last_7d.desc())
+        .limit(TOP_N)
+    ).all()
+    db.session.execute(delete(TopProductSummary))
+    if top:
+        db.session.execute(TopProductSummary.__table__.insert(), [
+            {"rank": rank, "product_id": pid, "branch_id": bid, "last_7d": cur, "prev_7d": prev}
+            for rank, (pid, bid, cur, prev) in enumerate(top, start=1)
+        ])
+
+
+def _claim(state, last_view_id):
+    """Boshqa yangilash bizdan oldin ishlamagan bo'lsa, navbatni olamiz."""
+    result = db.session.execute(
+        update(AnalyticsState)
+        .where(AnalyticsState.id == state.id, AnalyticsState.runs == state.runs)
+        .values(last_view_id=last_view_id, runs=AnalyticsState.runs + 1, refreshed_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def refresh():
+    """Yig'indilarni yangilaydi; qo'shilgan skanlar sonini (yoki band bo'lsa None) qaytaradi."""
+    state = db.session.get(AnalyticsState, 1)
+    if state is None:
+        db.session.add(AnalyticsState(id=1, last_view_id=0, runs=0))
+        db.session.commit()
+        state = db.session.get(AnalyticsState, 1)
+
+    cutoff = datetime.utcnow() - timedelta(seconds=SETTLE_SECONDS)
+    target = db.session.scalar(
+        select(func.max(LanguageView.id)).where(LanguageView.created_at <= cutoff)
+    ) or 0
+
+    added = 0
+    try:
+        # Katta tarixni (birinchi ishga tushirish) bo'laklab, har birini alohida tranzaksiyada
+        while True:
+            first_id = state.last_view_id
+            last_id = min(max(target, first_id), first_id + VIEW_BATCH)
+            if not _claim(state, last_id):
+                db.session.rollback()
+                return None
+            if last_id > first_id:
+                _upsert_daily(first_id, last_id)
+                added += db.session.scalar(
+                    select(func.count(LanguageView.id)).where(LanguageView.id > first_id, LanguageView.id <= last_id)
+                )
+            if last_id >= target:
+                _rebuild_summaries(datetime.utcnow().date())
+            db.session.commit()
+            db.session.expire(state)
+            if last_id >= target:
+                return added
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def forget_products(product_ids):
+    """O'chirilgan mahsulotlar yig'indilarini olib tashlaydi (SQLite da FK cascade yo'q)."""
+    db.session.execute(delete(TopProductSummary).where(TopProductSummary.product_id.in_(product_ids)))
+    db.session.execute(delete(ScanDailyStat).where(ScanDailyStat.product_id.in_(product_ids)))
+
+
+# -----------------------------
+# Jadval bo'yicha yangilash (ixtiyoriy)
+# -----------------------------
+_scheduler_pid = None
+_scheduler_lock = threading.Lock()
+
+
+def _scheduler(app):
+    while True:
+        time.sleep(REFRESH_SECONDS)
+        with app.app_context():
+            try:
+                refresh()
+            except Exception:
+                logger.exception("Analitika yig'indilarini yangilab bo‘lmadi")
+            finally:
+                db.session.remove()
+
+
+@analytics_bp.before_app_request
+def _ensure_scheduler():
+    # gunicorn --preload: fork'dan keyin har bir worker o'z oqimini ochadi
+    global _scheduler_pid
+    if not REFRESH_SECONDS or _scheduler_pid == os.getpid():
+        return
+    from flask import current_app
+    with _scheduler_lock:
+        if _scheduler_pid != os.getpid():
+            app = current_app._get_current_object()
+            threading.Thread(target=_scheduler, args=(app,), daemon=True, name="analytics-refresh").start()
+            _scheduler_pid = os.getpid()
+
+
+# -----------------------------
+# HTTP
+# -----------------------------
+@analytics_bp.route('/admin/analytics')
+@admin_required
+def overview():
+    rows = db.session.execute(
+        select(Branch, BranchScanSummary)
+        .outerjoin(BranchScanSummary, BranchScanSummary.branch_id == Branch.id)
+        .order_by(func.coalesce(BranchScanSummary.last_7d, 0).desc(), Branch.name)
+    ).all()
+    empty = BranchScanSummary(total=0, today=0, last_7d=0, prev_7d=0, last_30d=0, uz=0, ru=0, en=0)
+    branches = [(branch, summary or empty) for branch, summary in rows]
+
+    chain = BranchScanSummary(**{
+        field: sum(getattr(summary, field) for _, summary in branches)
+        for field in ["total", "today", "last_7d", "prev_7d", "last_30d", *LANGS]
+    })
+    top = (
+        TopProductSummary.query
+        .options(db.joinedload(TopProductSummary.product).joinedload(Product.branch))
+        .order_by(TopProductSummary.rank).all()
+    )
+    state = db.session.get(AnalyticsState, 1)
+    return render_template(
+        "analytics.html",
+        branches=branches, chain=chain, top=top,
+        refreshed_at=state.refreshed_at if state else None,
+        langs=LANGS,
+    )
+
+
+@analytics_bp.route('/admin/analytics/refresh', methods=['POST'])
+@admin_required
+def refresh_now():
+    added = refresh()
+    if added is None:
+        flash("Yangilash allaqachon bajarilmoqda, birozdan so‘ng qayta urinib ko‘ring", "warning")
+    else:
+        flash(f"Analitika yangilandi: {added} ta yangi skan qo‘shildi ✅", "success")
+    return redirect(url_for('analytics.overview'))
+
+
+# -----------------------------
+# CLI
+# -----------------------------
+@analytics_bp.cli.command("refresh")
+def refresh_command():
+    """Yig'indi jadvallarni inkremental yangilash (cron uchun)."""
+    added = refresh()
+    if added is None:
+        raise click.ClickException("Boshqa yangilash bajarilmoqda")
+    click.echo(f"{added} ta yangi skan qo‘shildi")
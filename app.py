@@ -1,22 +1,41 @@
 import os
 import time
+import hashlib
 import uuid
-import qrcode
+import qr_render
 import boto3
 import io
+import json
+import click
 from PIL import Image
 from dotenv import load_dotenv
 from werkzeug.utils import secure_filename
+from werkzeug.middleware.proxy_fix import ProxyFix
 from flask import Flask, render_template, request, redirect, url_for, session, abort, flash, session, make_response, jsonify
 
-from models import db, Product, Branch, LanguageView
+from models import db, Product, Branch, LanguageView, BranchDeleteJob, EDITABLE_FIELDS
 from auth import auth_bp, admin_required
-from sqlalchemy import func, extract
+from branch_jobs import (
+    start_branch_delete, run_branch_delete, create_branch_delete_job,
+    clone_branch_products, forget_clone_sources,
+)
+from exports import export_bp
+import analytics
+import warmup
+from sqlalchemy import func, extract, update
+from sqlalchemy.orm.exc import StaleDataError
 
 from datetime import datetime, timedelta
 from collections import Counter
 
 from translations import translations
+from jinja2 import ChoiceLoader, FileSystemLoader
+import product_templates
+import publish
+import page_cache
+import scan_guard
+import sqlite_mode
+import live_stats
 
 load_dotenv()
 
@@ -34,9 +53,24 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 # app.config['UPLOAD_FOLDER'] = UPLOAD_DIR
 # app.config['QR_FOLDER'] = QR_DIR
 
+# nginx / CDN ortida: klient IP (skan limitlari uchun) X-Forwarded-For dan olinadi
+if os.getenv('BEHIND_PROXY'):
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1)
+
+# templates/ + har bir til uchun oldindan yasalgan product_detail shablonlari
+app.jinja_loader = ChoiceLoader([
+    FileSystemLoader(os.path.join(BASE_DIR, 'templates')),
+    product_templates.loader,
+])
+
 # init db + blueprints
 db.init_app(app)
 app.register_blueprint(auth_bp)
+app.register_blueprint(export_bp)
+app.register_blueprint(analytics.analytics_bp)
+app.register_blueprint(warmup.warmup_bp)
+sqlite_mode.init_app(app)
+live_stats.init_app(app)
 
 from flask_migrate import Migrate
 migrate = Migrate(app, db)
@@ -45,6 +79,9 @@ R2_BUCKET = os.getenv("R2_BUCKET")
 R2_ENDPOINT = os.getenv("R2_ENDPOINT")  # masalan: https://<ACCOUNT_ID>.r2.cloudflarestorage.com
 R2_ACCESS_KEY = os.getenv("R2_ACCESS_KEY")
 R2_SECRET_KEY = os.getenv("R2_SECRET_KEY")
+R2_PUBLIC_URL = os.getenv("R2_PUBLIC_URL")
+# QR PNG ni R2 ga ham yuklash (0 — faqat /qr/<branch>/<product>.png endpointi)
+QR_STORE_R2 = os.getenv("QR_STORE_R2", "1") != "0"
 
 s3_client = boto3.client(
     "s3",
@@ -53,6 +90,35 @@ s3_client = boto3.client(
     aws_secret_access_key=R2_SECRET_KEY
 )
 
+def _r2_client():
+    return boto3.client(
+        "s3",
+        endpoint_url=f"https://{os.getenv('R2_ACCOUNT_ID')}.r2.cloudflarestorage.com",
+        aws_access_key_id=os.getenv("R2_ACCESS_KEY"),
+        aws_secret_access_key=os.getenv("R2_SECRET_KEY"),
+    )
+
+
+def r2_key_from_url(url):
+    """Public URL dan R2 kalitini ajratadi (masalan: uploads/x.png); bizniki bo‘lmasa None."""
+    prefix = f"{R2_PUBLIC_URL}/"
+    if url and R2_PUBLIC_URL and url.startswith(prefix):
+        return url[len(prefix):]
+    return None
+
+
+def _r2_object_matches(s3, url, data):
+    """R2 dagi obyekt shu baytlar bilan bir xilmi (ETag = MD5, oddiy yuklashlar uchun)."""
+    key = r2_key_from_url(url)
+    if not key:
+        return False
+    try:
+        etag = s3.head_object(Bucket=R2_BUCKET, Key=key)["ETag"].strip('"')
+    except Exception:
+        return False
+    return etag == hashlib.md5(data).hexdigest()
+
+
 def upload_file_to_r2(file_obj, filename, folder="uploads", content_type="application/octet-stream"):
     filename = secure_filename(filename)
     key = f"{folder}/{filename}"
@@ -83,24 +149,58 @@ def _unique_filename(filename: str) -> str:
 def _check_image_ext(filename: str) -> bool:
     return os.path.splitext(filename)[1].lower() in ALLOWED_EXT
 
-def _generate_qr_for_product(branch_id: int, product_id: int) -> str:
-    product_url = url_for(
+def _product_entry_url(branch_id: int, product_id: int) -> str:
+    return url_for(
         'product_entry',
         branch_id=branch_id,
         product_id=product_id,
         _external=True
     )
 
-    img = qrcode.make(product_url)
 
-    buffer = io.BytesIO()
-    img.save(buffer, format="PNG")
-    buffer.seek(0)
+def _qr_url(branch_id: int, product_id: int) -> str:
+    return url_for('qr_image', branch_id=branch_id, product_id=product_id, fmt='png', _external=True)
+
 
+def _upload_qr(product_id: int, png: bytes) -> str:
+    # request kontekstisiz ishlaydi — parallel oqimlardan chaqirish mumkin
     qr_filename = f"{product_id}.png"
 
     # ✅ Endi to‘liq URL qaytaradi
-    return upload_file_to_r2(buffer, qr_filename, "qrcodes", content_type="image/png")
+    return upload_file_to_r2(io.BytesIO(png), qr_filename, "qrcodes", content_type="image/png")
+
+
+def _generate_qr_for_product(branch_id: int, product_id: int) -> str:
+    # R2 nusxasi o‘chirilgan bo‘lsa — QR /qr/... endpointidan talab bo‘yicha chiziladi
+    if not QR_STORE_R2:
+        return _qr_url(branch_id, product_id)
+    png = qr_render.png_bytes(_product_entry_url(branch_id, product_id))
+    return _upload_qr(product_id, png)
+
+def _publish_product(product):
+    # Statik sahifa nashr qilinmasa ham mahsulot saqlangan bo‘ladi
+    try:
+        publish.publish_product(product)
+    except Exception:
+        app.logger.exception("Statik sahifani nashr qilib bo‘lmadi (product %s)", product.id)
+        flash("Statik sahifa yangilanmadi, keyinroq qayta nashr qiling", "warning")
+
+
+def _unpublish_product(branch_id, product_id):
+    try:
+        publish.unpublish_product(branch_id, product_id)
+    except Exception:
+        app.logger.exception("Statik sahifani o‘chirib bo‘lmadi (product %s)", product_id)
+
+
+@app.cli.command("publish-site")
+@click.option("--workers", default=4, show_default=True, help="Parallel filiallar soni")
+def publish_site_command(workers):
+    """Barcha mahsulot sahifalarini statik HTML sifatida qayta nashr qilish."""
+    if not publish.enabled():
+        raise click.ClickException("PUBLISH_MODE o‘rnatilmagan (r2 yoki local)")
+    counts = publish.rebuild_site(workers=workers)
+    click.echo(f"{len(counts)} ta filial, {sum(counts.values())} ta mahsulot nashr qilindi")
 
 @app.route("/upload", methods=["POST"])
 def upload():
@@ -201,6 +301,21 @@ def branch_stats(branch_id):
 
     return render_template("stats.html", stats_data=stats_data, total_scans=total_scans, branch_id=branch_id)
 
+
+# Statistika sahifasi uchun jonli yangilanishlar (SSE)
+@app.route('/admin/branch/<int:branch_id>/stats/stream')
+@admin_required
+def branch_stats_stream(branch_id):
+    Branch.query.get_or_404(branch_id)
+    return app.response_class(
+        live_stats.hub.stream(branch_id),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',  # nginx javobni buferlamasin
+        },
+    )
+
 # -----------------------------
 # Public routes (no auth)
 # -----------------------------
@@ -212,7 +327,7 @@ def index():
 @app.route("/branches")
 def branch_list():
     branches = Branch.query.all()
-    return render_template("branches.html", branches=branches)
+    return render_template("branches.html", branches=branches, delete_jobs=_branch_delete_jobs())
 
 @app.route("/branches/add", methods=["GET", "POST"])
 def branch_add():
@@ -230,7 +345,47 @@ def branch_add():
 def branch_dashboard(branch_id):
     branch = Branch.query.get_or_404(branch_id)
     products = Product.query.filter_by(branch_id=branch.id).all()
-    return render_template("dashboard.html", branch=branch, products=products)
+    other_branches = Branch.query.filter(Branch.id != branch.id).order_by(Branch.name).all()
+    return render_template("dashboard.html", branch=branch, products=products, other_branches=other_branches)
+
+
+# Boshqa filial katalogini shu filialga nusxalash
+@app.route("/branches/<int:branch_id>/clone", methods=["POST"])
+@admin_required
+def branch_clone(branch_id):
+    branch = Branch.query.get_or_404(branch_id)
+    source = Branch.query.get_or_404(request.form.get("source_branch_id", type=int))
+
+    try:
+        overrides = json.loads(request.form.get("overrides") or "{}")
+        count = clone_branch_products(source.id, branch.id, overrides)
+    except ValueError as e:  # json xatosi ham ValueError
+        flash("Xatolik: " + str(e), "danger")
+    else:
+        flash(f"{source.name} filialidan {count} ta mahsulot nusxalandi ✅", "success")
+        if count and publish.enabled():
+            flash("Statik sahifalar uchun `flask publish-site` ni ishga tushiring", "info")
+
+    return redirect(url_for("branch_dashboard", branch_id=branch.id))
+
+
+@app.cli.command("clone-branch")
+@click.argument("source_id", type=int)
+@click.argument("target_id", type=int)
+@click.option("--overrides", type=click.File("r"), help='JSON fayl: {"<manba_product_id>": {"name_uz": "..."}}')
+@click.option("--workers", default=16, show_default=True, help="Parallel QR yuklashlar soni")
+def clone_branch_command(source_id, target_id, overrides, workers):
+    """Manba filial mahsulotlarini nishon filialga nusxalash."""
+    for bid in (source_id, target_id):
+        if db.session.get(Branch, bid) is None:
+            raise click.ClickException(f"Filial topilmadi: {bid}")
+    # QR dagi to‘liq URL uchun
+    with app.test_request_context(base_url=publish.PUBLIC_BASE_URL):
+        try:
+            count = clone_branch_products(source_id, target_id, json.load(overrides) if overrides else None, workers)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+    click.echo(f"{count} ta mahsulot nusxalandi")
 
 @app.route("/branches/delete/<int:branch_id>", methods=["POST"])
 def branch_delete(branch_id):
@@ -239,17 +394,101 @@ def branch_delete(branch_id):
         flash("Filial topilmadi!", "danger")
         return redirect(url_for("branch_list"))
 
-    try:
-        db.session.delete(branch)
-        db.session.commit()
-        flash("Filial muvaffaqiyatli o‘chirildi ✅", "success")
-    except Exception as e:
-        db.session.rollback()
-        flash("Xatolik yuz berdi: " + str(e), "danger")
+    # Mahsulot va skanlar fonda, bo‘laklab o‘chiriladi — so‘rov kutib qolmaydi
+    start_branch_delete(app, branch)
+    flash("Filial o‘chirilmoqda, jarayon quyida ko‘rinadi ⏳", "info")
 
     return redirect(url_for("branch_list"))
 
 
+@app.route("/branches/delete-jobs/<int:job_id>")
+def branch_delete_status(job_id):
+    job = BranchDeleteJob.query.get_or_404(job_id)
+    return jsonify(job.to_dict())
+
+
+@app.cli.command("delete-branch")
+@click.argument("branch_id", type=int)
+def delete_branch_command(branch_id):
+    """Filialni shu jarayonda (sinxron) bo‘laklab o‘chirish yoki to‘xtab qolgan ishni davom ettirish."""
+    branch = db.session.get(Branch, branch_id)
+    if branch is None:
+        raise click.ClickException("Filial topilmadi")
+    job = (
+        BranchDeleteJob.query.filter_by(branch_id=branch.id)
+        .order_by(BranchDeleteJob.id.desc()).first()
+    )
+    if job is None or job.status == "done":
+        job, _ = create_branch_delete_job(branch)
+    run_branch_delete(job.id)
+    click.echo(f"{branch.name}: {job.deleted_products} ta mahsulot o‘chirildi")
+
+
+def _branch_delete_jobs():
+    recent = datetime.utcnow() - timedelta(hours=1)
+    return (
+        BranchDeleteJob.query
+        .filter(db.or_(BranchDeleteJob.status.in_(BranchDeleteJob.ACTIVE),
+                       BranchDeleteJob.finished_at >= recent))
+        .order_by(BranchDeleteJob.id.desc())
+        .all()
+    )
+
+
+
+
+# Service worker: umumiy CSS/shriftlar oldindan keshlanadi, sahifa va rasmlar
+# stale-while-revalidate, offline ko‘rishlar navbatga qo‘yiladi (templates/sw.js)
+SW_PRECACHE = [
+    "https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css",
+    "https://fonts.googleapis.com/css2?family=Montserrat:wght@400;600&display=swap",
+]
+SW_PAGE_FRESH_SECONDS = int(os.getenv("SW_PAGE_FRESH_SECONDS", 600))
+
+with open(os.path.join(BASE_DIR, 'templates', 'sw.js'), 'rb') as f:
+    SW_VERSION = hashlib.sha1(f.read() + repr(SW_PRECACHE).encode()).hexdigest()[:10]
+
+
+@app.route('/sw.js')
+def service_worker():
+    js = render_template(
+        'sw.js',
+        version=SW_VERSION,
+        precache=SW_PRECACHE,
+        page_fresh_seconds=SW_PAGE_FRESH_SECONDS,
+    )
+    resp = make_response(js)
+    resp.headers['Content-Type'] = 'application/javascript; charset=utf-8'
+    # Brauzer yangilanishni darhol ko‘rishi uchun
+    resp.headers['Cache-Control'] = 'no-cache'
+    resp.headers['Service-Worker-Allowed'] = '/'
+    return resp
+
+
+# QR kod: /qr/1/5.svg?size=1200&ec=H — chop etish uchun vektor yoki katta PNG
+# (PNG o‘lchami qr_render.SIZE_STEPS ga yuqoriga yaxlitlanadi, SVG — aynan so‘ralgan)
+@app.route('/qr/<int:branch_id>/<int:product_id>.<fmt>')
+def qr_image(branch_id, product_id, fmt):
+    if fmt not in qr_render.FORMATS:
+        abort(404)
+    size = request.args.get('size', type=int)
+    if size is not None and not qr_render.MIN_SIZE <= size <= qr_render.MAX_SIZE:
+        abort(400, f"size {qr_render.MIN_SIZE}..{qr_render.MAX_SIZE} oralig‘ida bo‘lishi kerak")
+    error = request.args.get('ec', qr_render.DEFAULT_ERROR).upper()
+    if error not in qr_render.ERROR_LEVELS:
+        abort(400, "ec: L, M, Q yoki H")
+
+    exists = db.session.query(Product.id).filter_by(id=product_id, branch_id=branch_id).first()
+    if exists is None:
+        abort(404)
+
+    data = qr_render.render(_product_entry_url(branch_id, product_id), fmt, size, error)
+    resp = make_response(data)
+    resp.headers['Content-Type'] = qr_render.FORMATS[fmt]
+    # Bir xil URL har doim bir xil rasm beradi
+    resp.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    resp.set_etag(hashlib.sha1(data).hexdigest())
+    return resp.make_conditional(request)
 
 
 # Mahsulotni yuklash sahifasi (QR orqali kirganda)
@@ -264,41 +503,107 @@ def product_entry(branch_id, product_id):
 def select_language(branch_id, product_id):
     product = Product.query.filter_by(id=product_id, branch_id=branch_id).first_or_404()
 
-    product.last_scanned_at = datetime.now()
-    db.session.commit()
+    if not _scan_skip_reason(_scan_user_id()):
+        if sqlite_mode.scan_writer:
+            sqlite_mode.scan_writer.touch(product.id)
+        else:
+            # Core UPDATE: version va updated_at ga tegmaydi
+            db.session.execute(
+                update(Product).where(Product.id == product.id)
+                .values(last_scanned_at=datetime.now(), updated_at=Product.updated_at)
+            )
+            db.session.commit()
 
     return render_template('select_language.html', product=product, branch_id=branch_id)
 
 
+def _scan_user_id():
+    # Foydalanuvchi identifikatori (cookie orqali)
+    return request.cookies.get("user_id") or str(uuid.uuid4())
+
+
+def _scan_skip_reason(user_id, js_verified=None):
+    """Bot / JS siz klient / limitdan oshgan so‘rov bo‘lsa — sababi, aks holda None."""
+    if js_verified is None:
+        js_verified = bool(request.cookies.get(scan_guard.JS_COOKIE))
+    return scan_guard.check(request.remote_addr, user_id, request.user_agent.string, js_verified)
+
+
+def _count_view(branch_id, product, lang, user_id):
+    """Ko‘rishni foydalanuvchi (cookie) bo‘yicha bir marta hisoblaydi."""
+    viewed_key = f"viewed_{branch_id}_{product.id}_{user_id}"
+    # Token faqat haqiqiy yozuv uchun olinadi (qayta ko‘rishlar limitni yemaydi)
+    if not session.get(viewed_key) and not scan_guard.take(request.remote_addr, user_id):
+        if sqlite_mode.scan_writer:
+            # SQLite: yagona yozuvchi oqimi bo‘laklab yozadi
+            sqlite_mode.scan_writer.record_view(product.id, lang)
+        else:
+            # Umumiy ko‘rishlarni oshirish (atomar; version va updated_at ga tegmaydi)
+            db.session.execute(
+                update(Product).where(Product.id == product.id)
+                .values(views=func.coalesce(Product.views, 0) + 1, last_scanned_at=datetime.utcnow(),
+                        updated_at=Product.updated_at)
+            )
+
+            # ✅ Til bo‘yicha ko‘rishni saqlash
+            lang_view = LanguageView(product_id=product.id, lang=lang)
+            db.session.add(lang_view)
+
+            db.session.commit()
+        live_stats.publish(branch_id, product.id, lang)
+        session[viewed_key] = True
+
+
+def _render_product_detail(product, lang, branch_id):
+    html = render_template(product_templates.detail_template_name(lang), product=product, lang=lang, branch_id=branch_id)
+    # Admin sahifasi (navbar) boshqalarga keshdan berilmasin
+    if not session.get('admin'):
+        page_cache.set_product_page(branch_id, product, lang, html)
+    return html
+
+
 # Mahsulot tafsilotlari (tanlangan til bilan)
 @app.route("/branch/<int:branch_id>/product/<int:product_id>/<lang>")
 def product_detail(branch_id, product_id, lang):
-    product = Product.query.filter_by(id=product_id, branch_id=branch_id).first_or_404()
-
     if lang not in ["uz", "ru", "en"]:
+        Product.query.filter_by(id=product_id, branch_id=branch_id).first_or_404()
         abort(400, "Noto‘g‘ri til tanlandi")
 
-    # Foydalanuvchi identifikatori (cookie orqali)
-    user_id = request.cookies.get("user_id")
-    if not user_id:
-        user_id = str(uuid.uuid4())
+    user_id = _scan_user_id()
+
+    if _scan_skip_reason(user_id):
+        # Bot yoki limitdan oshgan: sahifa keshdan, bazaga yozilmaydi
+        html = page_cache.get_product_page(branch_id, product_id, lang)
+        if html is None:
+            product = Product.query.filter_by(id=product_id, branch_id=branch_id).first_or_404()
+            html = _render_product_detail(product, lang, branch_id)
+    else:
+        product = Product.query.filter_by(id=product_id, branch_id=branch_id).first_or_404()
+        _count_view(branch_id, product, lang, user_id)
+        # Isitilgan (yoki yaqinda render qilingan) sahifa, agar mahsulot o‘shandan beri tahrirlanmagan bo‘lsa
+        html = None if session.get('admin') else page_cache.get_product_page(branch_id, product_id, lang, product.version)
+        if html is None:
+            html = _render_product_detail(product, lang, branch_id)
+
+    resp = make_response(html)
+    resp.set_cookie("user_id", user_id, max_age=60*60*24*365)  # 1 yil
+    return resp
+
 
-    viewed_key = f"viewed_{branch_id}_{product_id}_{user_id}"
-    if not session.get(viewed_key):
-        # Umumiy ko‘rishlarni oshirish
-        product.views = (product.views or 0) + 1
-        product.last_scanned_at = datetime.utcnow()
+# Statik (oldindan render qilingan) sahifalardan keladigan ko‘rish signali
+@app.route("/branch/<int:branch_id>/product/<int:product_id>/<lang>/view", methods=["POST"])
+def product_view_beacon(branch_id, product_id, lang):
+    if lang not in ["uz", "ru", "en"]:
+        abort(400, "Noto‘g‘ri til tanlandi")
 
-        # ✅ Til bo‘yicha ko‘rishni saqlash
-        lang_view = LanguageView(product_id=product.id, lang=lang)
-        db.session.add(lang_view)
+    user_id = _scan_user_id()
 
-        db.session.commit()
-        session[viewed_key] = True
+    # Beacon faqat JS dan keladi
+    if not _scan_skip_reason(user_id, js_verified=True):
+        product = Product.query.filter_by(id=product_id, branch_id=branch_id).first_or_404()
+        _count_view(branch_id, product, lang, user_id)
 
-    resp = make_response(
-        render_template("product_detail.html", product=product, lang=lang, branch_id=branch_id)
-    )
+    resp = make_response("", 204)
     resp.set_cookie("user_id", user_id, max_age=60*60*24*365)  # 1 yil
     return resp
 
@@ -312,7 +617,7 @@ def dashboard():
     # Hamma filiallar va mahsulotlar
     products = Product.query.order_by(Product.id.desc()).all()
     branches = Branch.query.all()
-    return render_template('branches.html', products=products, branches=branches)
+    return render_template('branches.html', products=products, branches=branches, delete_jobs=_branch_delete_jobs())
 
 
 @app.route("/branches/<int:branch_id>/products/add", methods=["GET", "POST"])
@@ -413,6 +718,7 @@ def add_product(branch_id):
         # QR code yaratish (public til tanlash sahifasiga)
         product.qr_code = _generate_qr_for_product(branch.id, product.id)
         db.session.commit()
+        _publish_product(product)
         return redirect(url_for("dashboard", branch_id=branch.id, product_id=product.id))
     return render_template("product_form.html", branch=branch)
 
@@ -424,99 +730,70 @@ def edit_product(branch_id, product_id):
     product = Product.query.get_or_404(product_id)
 
     if request.method == 'POST':
-        # Uch tilda nom va tavsif
-        product.name_uz = request.form.get('name_uz')
-        product.name_ru = request.form.get('name_ru')
-        product.name_en = request.form.get('name_en')
-
-        product.for_whom_uz = request.form.get('for_whom_uz', '')
-        product.for_whom_ru = request.form.get('for_whom_ru', '')
-        product.for_whom_en = request.form.get('for_whom_en', '')
-
-        product.description_uz = request.form.get('description_uz')
-        product.description_ru = request.form.get('description_ru')
-        product.description_en = request.form.get('description_en')
-
-        # Tarkibiy qismi
-        product.components_uz = request.form.get('components_uz')
-        product.components_ru = request.form.get('components_ru')
-        product.components_en = request.form.get('components_en')
-
-        # Ishlab chiqaruvchi
-        product.company_uz = request.form.get('company_uz')
-        product.company_ru = request.form.get('company_ru')
-        product.company_en = request.form.get('company_en')
-
-        # Foydalanish tartibi
-        product.usage_uz = request.form.get('usage_uz')
-        product.usage_ru = request.form.get('usage_ru')
-        product.usage_en = request.form.get('usage_en')
-
-        # Foydalanish mumkin bo‘lmagan holatlar
-        product.not_usage_uz = request.form.get('not_usage_uz')
-        product.not_usage_ru = request.form.get('not_usage_ru')
-        product.not_usage_en = request.form.get('not_usage_en')
-
-        # Saqlash shartlari
-        product.storage_uz = request.form.get('storage_uz')
-        product.storage_ru = request.form.get('storage_ru')
-        product.storage_en = request.form.get('storage_en')
-
-        # Yaroqlilik muddati
-        product.expiry_uz = request.form.get('expiry_uz')
-        product.expiry_ru = request.form.get('expiry_ru')
-        product.expiry_en = request.form.get('expiry_en')
-
-        # Sertifikat
-        product.certificate_uz = request.form.get('certificate_uz')
-        product.certificate_ru = request.form.get('certificate_ru')
-        product.certificate_en = request.form.get('certificate_en')
-
-        # Aksiya va bonuslar
-        product.promotion_uz = request.form.get('promotion_uz')
-        product.promotion_ru = request.form.get('promotion_ru')
-        product.promotion_en = request.form.get('promotion_en')
-
-        # Xulosa
-        product.conclusion_uz = request.form.get('conclusion_uz')
-        product.conclusion_ru = request.form.get('conclusion_ru')
-        product.conclusion_en = request.form.get('conclusion_en')
-
-        # R2 client
-        s3 = boto3.client(
-            "s3",
-            endpoint_url=f"https://{os.getenv('R2_ACCOUNT_ID')}.r2.cloudflarestorage.com",
-            aws_access_key_id=os.getenv("R2_ACCESS_KEY"),
-            aws_secret_access_key=os.getenv("R2_SECRET_KEY"),
-        )
+        # Boshqa admin shu orada saqlagan bo‘lsa — uning o‘zgarishlarini ustidan yozmaymiz
+        if request.form.get('version', type=int) not in (None, product.version):
+            flash("Mahsulotni boshqa foydalanuvchi o‘zgartirdi. Yangi ma’lumotlarni tekshirib, qayta saqlang.", "warning")
+            return render_template('edit_product.html', product=product)
+
+        # Faqat o‘zgargan maydonlar yoziladi (formada yo‘q maydon o‘zgarmaydi)
+        changed = []
+        for field in EDITABLE_FIELDS:
+            if field not in request.form:
+                continue
+            value = request.form[field]
+            if value != (getattr(product, field) or ''):
+                setattr(product, field, value)
+                changed.append(field)
+
+        s3 = None
 
         # 📌 Rasm
         image_file = request.files.get('image')
         if image_file and image_file.filename != '':
-            filename = _unique_filename(image_file.filename)
-            s3.upload_fileobj(
-                Fileobj=io.BytesIO(image_file.read()),
-                Bucket=os.getenv("R2_BUCKET"),
-                Key=f"uploads/{filename}",
-                ExtraArgs={"ContentType": image_file.content_type}
-            )
-            # 🔹 URL ni DB ga yozamiz
-            product.image = f"{os.getenv('R2_PUBLIC_URL')}/uploads/{filename}"
+            data = image_file.read()
+            s3 = s3 or _r2_client()
+            if not _r2_object_matches(s3, product.image, data):
+                filename = _unique_filename(image_file.filename)
+                s3.upload_fileobj(
+                    Fileobj=io.BytesIO(data),
+                    Bucket=os.getenv("R2_BUCKET"),
+                    Key=f"uploads/{filename}",
+                    ExtraArgs={"ContentType": image_file.content_type}
+                )
+                # 🔹 URL ni DB ga yozamiz
+                product.image = f"{os.getenv('R2_PUBLIC_URL')}/uploads/{filename}"
+                changed.append('image')
 
         # 📌 QR Code
         qr_file = request.files.get('qr_code')
         if qr_file and qr_file.filename != '':
-            filename = _unique_filename(qr_file.filename)
-            s3.upload_fileobj(
-                Fileobj=io.BytesIO(qr_file.read()),
-                Bucket=os.getenv("R2_BUCKET"),
-                Key=f"qrcodes/{filename}",
-                ExtraArgs={"ContentType": qr_file.content_type}
-            )
-            product.qr_code = f"{os.getenv('R2_PUBLIC_URL')}/qrcodes/{filename}"
-
-        # ✅ Endi commit va redirect har doim ishlaydi
-        db.session.commit()
+            data = qr_file.read()
+            s3 = s3 or _r2_client()
+            if not _r2_object_matches(s3, product.qr_code, data):
+                filename = _unique_filename(qr_file.filename)
+                s3.upload_fileobj(
+                    Fileobj=io.BytesIO(data),
+                    Bucket=os.getenv("R2_BUCKET"),
+                    Key=f"qrcodes/{filename}",
+                    ExtraArgs={"ContentType": qr_file.content_type}
+                )
+                product.qr_code = f"{os.getenv('R2_PUBLIC_URL')}/qrcodes/{filename}"
+                changed.append('qr_code')
+
+        if not changed:
+            # commit yo‘q — updated_at, keshlar va statik sahifalar o‘zgarmaydi
+            flash("O‘zgarish yo‘q", "info")
+            return redirect(url_for("dashboard", branch_id=branch.id))
+
+        try:
+            db.session.commit()
+        except StaleDataError:
+            db.session.rollback()
+            flash("Mahsulotni boshqa foydalanuvchi o‘zgartirdi. Yangi ma’lumotlarni tekshirib, qayta saqlang.", "warning")
+            return render_template('edit_product.html', product=Product.query.get_or_404(product_id))
+
+        page_cache.product_pages.invalidate((product.branch_id, product.id))
+        _publish_product(product)
         flash("Mahsulot muvaffaqiyatli tahrirlandi ✏️", "success")
         return redirect(url_for("dashboard", branch_id=branch.id))
 
@@ -532,8 +809,12 @@ def delete_product(branch_id, product_id):
     if request.method == 'POST':
         # Bog‘liq yozuvlarni o‘chirish
         LanguageView.query.filter_by(product_id=product.id).delete()
+        analytics.forget_products([product.id])
+        forget_clone_sources([product.id])
         db.session.delete(product)
         db.session.commit()
+        page_cache.product_pages.invalidate((branch.id, product_id))
+        _unpublish_product(branch.id, product_id)
 
         flash("Mahsulot muvaffaqiyatli o‘chirildi ✅", "success")
         return redirect(url_for("dashboard", branch_id=branch.id))
@@ -0,0 +1,325 @@
+"""
+ASGI kirish nuqtasi (ixtiyoriy).
+
+Ommaviy QR sahifalari (product_entry, select_language, product_detail) async
+SQLAlchemy sessiyalari va async Jinja render bilan xizmat qiladi; qolgan barcha
+yo'llar (admin, login, upload ...) mavjud Flask ilovasiga uzatiladi.
+
+Ishga tushirish:
+    uvicorn asgi:application --workers 2
+yoki
+    gunicorn asgi:application -k uvicorn.workers.UvicornWorker
+"""
+import asyncio
+import contextlib
+import logging
+import os
+import uuid
+from datetime import datetime
+
+from a2wsgi import WSGIMiddleware
+from jinja2 import Environment
+from sqlalchemy import select, update, func, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from starlette.applications import Starlette
+from starlette.responses import HTMLResponse, RedirectResponse, StreamingResponse
+from starlette.routing import Route, Mount
+from werkzeug.exceptions import NotFound, BadRequest
+
+import live_stats
+import page_cache
+import product_templates
+import scan_guard
+import sqlite_mode
+import warmup
+from app import app as flask_app
+from models import db, Branch, Product, LanguageView
+
+logger = logging.getLogger(__name__)
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def _async_db_url():
+    # Flask-SQLAlchemy sqlite yo'lini instance papkasiga moslaydi, shu URL ni olamiz
+    with flask_app.app_context():
+        url = db.engine.url
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f"ASGI rejimi {backend} bazasini qo‘llab-quvvatlamaydi")
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+def _engine_options(url):
+    if url.get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": int(os.getenv("ASGI_DB_POOL_SIZE", 20)),
+        "max_overflow": int(os.getenv("ASGI_DB_MAX_OVERFLOW", 30)),
+        "pool_pre_ping": True,
+    }
+
+
+_db_url = _async_db_url()
+engine = create_async_engine(_db_url, **_engine_options(_db_url))
+if sqlite_mode.is_sqlite(engine):
+    sqlite_mode.install_pragmas(engine.sync_engine)
+# commit'dan keyin obyektlar template'da lazy-load qilinmasligi uchun
+AsyncSession = async_sessionmaker(engine, expire_on_commit=False)
+
+
+# -----------------------------
+# Flask bilan bir xil cookie/session va template muhiti
+# -----------------------------
+_session_serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+
+
+def _load_flask_session(request):
+    cookie = request.cookies.get(flask_app.config["SESSION_COOKIE_NAME"])
+    if not cookie:
+        return {}
+    max_age = int(flask_app.permanent_session_lifetime.total_seconds())
+    try:
+        return dict(_session_serializer.loads(cookie, max_age=max_age))
+    except Exception:
+        return {}
+
+
+def _save_flask_session(response, data):
+    cfg = flask_app.config
+    response.set_cookie(
+        cfg["SESSION_COOKIE_NAME"],
+        _session_serializer.dumps(data),
+        max_age=int(flask_app.permanent_session_lifetime.total_seconds()) if data.get("_permanent") else None,
+        path=cfg["SESSION_COOKIE_PATH"] or cfg["APPLICATION_ROOT"] or "/",
+        domain=cfg["SESSION_COOKIE_DOMAIN"] or None,
+        secure=cfg["SESSION_COOKIE_SECURE"],
+        httponly=cfg["SESSION_COOKIE_HTTPONLY"],
+        samesite=cfg["SESSION_COOKIE_SAMESITE"],
+    )
+
+
+jinja_env = Environment(
+    loader=flask_app.jinja_loader,
+    autoescape=flask_app.select_jinja_autoescape,
+    enable_async=True,
+)
+jinja_env.filters.update(flask_app.jinja_env.filters)
+
+
+async def render(request, template_name, flask_session, **context):
+    adapter = flask_app.url_map.bind(
+        request.url.netloc,
+        script_name=request.scope.get("root_path") or "/",
+        url_scheme=request.url.scheme,
+    )
+
+    def url_for(endpoint, _external=False, **values):
+        return adapter.build(endpoint, values, force_external=_external)
+
+    def get_flashed_messages(with_categories=False, category_filter=()):
+        flashes = flask_session.pop("_flashes", [])
+        if category_filter:
+            flashes = [f for f in flashes if f[0] in category_filter]
+        return flashes if with_categories else [f[1] for f in flashes]
+
+    template = jinja_env.get_template(template_name)
+    return await template.render_async(
+        url_for=url_for,
+        session=flask_session,
+        get_flashed_messages=get_flashed_messages,
+        **context,
+    )
+
+
+def _client_ip(request):
+    return request.client.host if request.client else None
+
+
+def _scan_skip_reason(request, user_id):
+    return scan_guard.check(
+        _client_ip(request),
+        user_id,
+        request.headers.get("user-agent", ""),
+        bool(request.cookies.get(scan_guard.JS_COOKIE)),
+    )
+
+
+async def _record_view(db_session, product, lang):
+    # Atomar oshirish: bir vaqtdagi skanlar bir-birini yo‘qotmaydi
+    await db_session.execute(
+        update(Product)
+        .where(Product.id == product.id)
+        .values(views=func.coalesce(Product.views, 0) + 1, last_scanned_at=datetime.utcnow(),
+                updated_at=Product.updated_at)
+    )
+    db_session.add(LanguageView(product_id=product.id, lang=lang))
+    await db_session.commit()
+
+
+def _http_error(exc):
+    return HTMLResponse(exc.get_body(), status_code=exc.code)
+
+
+async def _get_product(db_session, branch_id, product_id):
+    result = await db_session.execute(
+        select(Product).filter_by(id=product_id, branch_id=branch_id)
+    )
+    return result.scalars().first()
+
+
+# -----------------------------
+# Public routes (no auth)
+# -----------------------------
+async def product_entry(request):
+    branch_id = request.path_params["branch_id"]
+    product_id = request.path_params["product_id"]
+    async with AsyncSession() as s:
+        product = await _get_product(s, branch_id, product_id)
+    if product is None:
+        return _http_error(NotFound())
+
+    flask_session = _load_flask_session(request)
+    html = await render(request, "loading.html", flask_session, product=product, branch_id=branch_id)
+    return HTMLResponse(html)
+
+
+async def select_language(request):
+    branch_id = request.path_params["branch_id"]
+    product_id = request.path_params["product_id"]
+    async with AsyncSession() as s:
+        product = await _get_product(s, branch_id, product_id)
+        if product is None:
+            return _http_error(NotFound())
+
+        user_id = request.cookies.get("user_id") or str(uuid.uuid4())
+        if not _scan_skip_reason(request, user_id):
+            if sqlite_mode.scan_writer:
+                sqlite_mode.scan_writer.touch(product.id)
+            else:
+                # Core UPDATE: version va updated_at ga tegmaydi
+                await s.execute(
+                    update(Product).where(Product.id == product.id)
+                    .values(last_scanned_at=datetime.now(), updated_at=Product.updated_at)
+                )
+                await s.commit()
+
+    flask_session = _load_flask_session(request)
+    html = await render(request, "select_language.html", flask_session, product=product, branch_id=branch_id)
+    return HTMLResponse(html)
+
+
+async def product_detail(request):
+    branch_id = request.path_params["branch_id"]
+    product_id = request.path_params["product_id"]
+    lang = request.path_params["lang"]
+
+    user_id = request.cookies.get("user_id")
+    if not user_id:
+        user_id = str(uuid.uuid4())
+
+    flask_session = _load_flask_session(request)
+    flashes_before = "_flashes" in flask_session
+    session_modified = False
+
+    skip = lang in ["uz", "ru", "en"] and _scan_skip_reason(request, user_id)
+    # Bot yoki limitdan oshgan: sahifa keshdan, bazaga yozilmaydi
+    html = page_cache.get_product_page(branch_id, product_id, lang) if skip else None
+
+    if html is None:
+        async with AsyncSession() as s:
+            product = await _get_product(s, branch_id, product_id)
+            if product is None:
+                return _http_error(NotFound())
+
+            if lang not in ["uz", "ru", "en"]:
+                return _http_error(BadRequest("Noto‘g‘ri til tanlandi"))
+
+            viewed_key = f"viewed_{branch_id}_{product_id}_{user_id}"
+            # Token faqat haqiqiy yozuv uchun olinadi (qayta ko‘rishlar limitni yemaydi)
+            if not skip and not flask_session.get(viewed_key) and not scan_guard.take(_client_ip(request), user_id):
+                if sqlite_mode.scan_writer:
+                    sqlite_mode.scan_writer.record_view(product.id, lang)
+                else:
+                    await _record_view(s, product, lang)
+                live_stats.publish(branch_id, product.id, lang)
+                flask_session[viewed_key] = True
+                session_modified = True
+
+        # Isitilgan (yoki yaqinda render qilingan) sahifa, agar mahsulot o‘shandan beri tahrirlanmagan bo‘lsa
+        if not flask_session.get("admin"):
+            html = page_cache.get_product_page(branch_id, product_id, lang, product.version)
+        if html is None:
+            html = await render(request, product_templates.detail_template_name(lang), flask_session, product=product, lang=lang, branch_id=branch_id)
+            if not flask_session.get("admin"):
+                page_cache.set_product_page(branch_id, product, lang, html)
+
+    resp = HTMLResponse(html)
+    if session_modified or (flashes_before and "_flashes" not in flask_session):
+        _save_flask_session(resp, flask_session)
+    resp.set_cookie("user_id", user_id, max_age=60*60*24*365)  # 1 yil
+    return resp
+
+
+# -----------------------------
+# Admin: jonli statistika (SSE) — har bir ulanish a2wsgi oqimini emas, korutinani band qiladi
+# -----------------------------
+async def branch_stats_stream(request):
+    branch_id = request.path_params["branch_id"]
+    if not _load_flask_session(request).get("admin"):
+        return RedirectResponse("/login", status_code=302)
+    async with AsyncSession() as s:
+        if await s.get(Branch, branch_id) is None:
+            return _http_error(NotFound())
+
+    return StreamingResponse(
+        live_stats.hub.astream(branch_id),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # nginx javobni buferlamasin
+        },
+    )
+
+
+async def _warm_async_pool():
+    # Async engine pool'i (ommaviy sahifalar shu orqali o'qiydi)
+    conns = [await engine.connect() for _ in range(warmup.DB_CONNECTIONS)]
+    for conn in conns:
+        await conn.execute(text("SELECT 1"))
+        await conn.close()
+
+
+@contextlib.asynccontextmanager
+async def lifespan(_app):
+    if warmup.ENABLED:
+        loop = asyncio.get_running_loop()
+        # Flask tomoni (shablonlar, sahifa keshi, sync pool, R2) alohida oqimda;
+        # ishga tushish ko'pi bilan WARMUP_BLOCK_SECONDS kutadi
+        sync_warmup = loop.run_in_executor(None, warmup.start, flask_app, warmup.BLOCK_SECONDS)
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(_warm_async_pool(), sync_warmup), warmup.BLOCK_SECONDS
+            )
+        except asyncio.TimeoutError:
+            pass
+        except Exception:
+            logger.exception("Async pool'ni isitib bo‘lmadi")
+    yield
+    await engine.dispose()
+
+
+application = Starlette(
+    routes=[
+        Route("/branch/{branch_id:int}/product/{product_id:int}", product_entry),
+        Route("/branch/{branch_id:int}/select-language/{product_id:int}", select_language),
+        Route("/branch/{branch_id:int}/product/{product_id:int}/{lang}", product_detail),
+        Route("/admin/branch/{branch_id:int}/stats/stream", branch_stats_stream),
+        # Qolgan hamma narsa (admin, login, upload ...) — Flask
+        Mount("/", app=WSGIMiddleware(flask_app)),
+    ],
+    lifespan=lifespan,
+)
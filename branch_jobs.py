@@ -0,0 +1,283 @@
+"""
+Filial darajasidagi og'ir amallar: fonda bo'laklab o'chirish va katalogni klonlash.
+
+O'chirish
+---------
+
+Katta filialda (minglab mahsulot, millionlab skan) bitta `DELETE` jadvallarni
+uzoq qulflaydi va so'rov vaqt limitiga tushadi. Shu sabab:
+  1. skanlar (language_views) SCAN_BATCH tadan,
+  2. mahsulotlar PRODUCT_BATCH tadan (R2 dagi rasm/QR/statik sahifalari bilan),
+  3. oxirida filialning o'zi
+alohida qisqa tranzaksiyalarda o'chiriladi. Jarayon `BranchDeleteJob` da
+saqlanadi, shuning uchun har qanday worker progressni ko'rsata oladi, to'xtab
+qolgan ish esa qayta ishga tushirilsa davom etadi.
+
+Klonlash
+--------
+Manba filial mahsulotlari bitta `INSERT … SELECT` bilan nishon filialga
+ko'chiriladi; rasmlar qayta yuklanmaydi (bir xil R2 URL ga havola), faqat
+filialga xos QR kodlar parallel yaratiladi.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import delete, select, func, insert, update, literal, bindparam, exists
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
+
+from models import db, Branch, Product, LanguageView, BranchDeleteJob, EDITABLE_FIELDS
+import analytics
+import publish
+import qr_render
+
+PRODUCT_BATCH = 200
+SCAN_BATCH = 5000
+R2_DELETE_BATCH = 1000  # S3 delete_objects chegarasi
+QR_WORKERS = 16
+
+# Klonlashda manbadan ko'chirilmaydigan (qayta o'rnatiladigan) ustunlar
+CLONE_RESET_COLUMNS = {
+    "id", "branch_id", "cloned_from_id", "qr_code", "views", "last_scanned_at",
+    "created_at", "updated_at", "version",
+}
+CLONE_OVERRIDE_FIELDS = set(EDITABLE_FIELDS) | {"image"}
+
+
+def _delete_r2_objects(branch_id, product_ids):
+    from app import s3_client, R2_BUCKET, r2_key_from_url
+
+    rows = db.session.execute(
+        select(Product.image, Product.qr_code).where(Product.id.in_(product_ids))
+    ).all()
+    images = {image for image, _ in rows if image}
+    # Boshqa filiallardagi mahsulotlar ishlatayotgan rasmlar o'chirilmaydi
+    shared = {
+        image for (image,) in db.session.execute(
+            select(Product.image).distinct()
+            .where(Product.image.in_(images), Product.branch_id != branch_id)
+        )
+    } if images else set()
+
+    urls = [url for url in images - shared] + [qr for _, qr in rows if qr]
+    keys = [key for key in map(r2_key_from_url, urls) if key]
+    for i in range(0, len(keys), R2_DELETE_BATCH):
+        s3_client.delete_objects(
+            Bucket=R2_BUCKET,
+            Delete={"Objects": [{"Key": key} for key in keys[i:i + R2_DELETE_BATCH]], "Quiet": True},
+        )
+
+
+def _delete_scans(job, product_ids):
+    analytics.forget_products(product_ids)
+    while True:
+        scan_ids = db.session.execute(
+            select(LanguageView.id).where(LanguageView.product_id.in_(product_ids)).limit(SCAN_BATCH)
+        ).scalars().all()
+        if not scan_ids:
+            return
+        db.session.execute(delete(LanguageView).where(LanguageView.id.in_(scan_ids)))
+        job.heartbeat_at = datetime.utcnow()
+        db.session.commit()
+
+
+def forget_clone_sources(product_ids):
+    """Nusxalarning `cloned_from_id` sini bo'shatadi — SQLite da FK (ON DELETE SET NULL) ishlamaydi,
+    o'chirilgan id esa keyin yangi mahsulotga berilib, qayta klonlashda uni o'tkazib yuborishi mumkin."""
+    db.session.execute(
+        update(Product).where(Product.cloned_from_id.in_(product_ids))
+        .values(cloned_from_id=None).execution_options(synchronize_session=False)
+    )
+
+
+def run_branch_delete(job_id):
+    job = db.session.get(BranchDeleteJob, job_id)
+    branch_id = job.branch_id
+
+    job.status = "running"
+    job.error = None
+    job.heartbeat_at = datetime.utcnow()
+    job.total_products = (job.deleted_products or 0) + db.session.scalar(
+        select(func.count(Product.id)).where(Product.branch_id == branch_id)
+    )
+    db.session.commit()
+
+    try:
+        while True:
+            product_ids = db.session.execute(
+                select(Product.id).where(Product.branch_id == branch_id)
+                .order_by(Product.id).limit(PRODUCT_BATCH)
+            ).scalars().all()
+            if not product_ids:
+                break
+
+            _delete_scans(job, product_ids)
+            _delete_r2_objects(branch_id, product_ids)
+            for product_id in product_ids:
+                publish.unpublish_product(branch_id, product_id)
+
+            forget_clone_sources(product_ids)
+            db.session.execute(
+                delete(Product).where(Product.id.in_(product_ids)).execution_options(synchronize_session=False)
+            )
+            job.deleted_products = (job.deleted_products or 0) + len(product_ids)
+            job.heartbeat_at = datetime.utcnow()
+            db.session.commit()
+
+        db.session.execute(delete(Branch).where(Branch.id == branch_id))
+        job.status = "done"
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(BranchDeleteJob, job_id)
+        job.status = "failed"
+        job.error = str(e)
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        raise
+
+
+def create_branch_delete_job(branch):
+    """(ish, yangi_ochildimi): filialda faol ish allaqachon bo'lsa (parallel so'rov), o'sha qaytadi."""
+    job = BranchDeleteJob(
+        branch_id=branch.id, branch_name=branch.name, status="pending", heartbeat_at=datetime.utcnow()
+    )
+    db.session.add(job)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # uq_branch_delete_jobs_active_branch: boshqa so'rov bizdan oldin ochdi
+        db.session.rollback()
+        return BranchDeleteJob.query.filter(
+            BranchDeleteJob.branch_id == branch.id, BranchDeleteJob.status.in_(BranchDeleteJob.ACTIVE)
+        ).first(), False
+    return job, True
+
+
+def start_branch_delete(app, branch):
+    """Filial uchun o'chirish ishini yaratadi (yoki mavjudini qayta ishga tushiradi) va fonda boshlaydi."""
+    job = (
+        BranchDeleteJob.query.filter_by(branch_id=branch.id)
+        .order_by(BranchDeleteJob.id.desc()).first()
+    )
+    if job is None or job.status == "done":
+        job, created = create_branch_delete_job(branch)
+        if not created:
+            return job
+    elif job.status in BranchDeleteJob.ACTIVE and not job.stale:
+        # Navbatda yoki ishlayapti — ikkinchi oqim ochilmaydi
+        return job
+    else:
+        # Xato bilan tugagan yoki oqimi o'lgan (heartbeat eskirgan) ish — davom ettiriladi.
+        # Shartli UPDATE: ikki so'rov bir vaqtda qayta ishga tushirsa, faqat bittasi oladi
+        claimed = db.session.execute(
+            update(BranchDeleteJob)
+            .where(BranchDeleteJob.id == job.id, BranchDeleteJob.status == job.status,
+                   BranchDeleteJob.heartbeat_at.is_(None) if job.heartbeat_at is None
+                   else BranchDeleteJob.heartbeat_at == job.heartbeat_at)
+            .values(status="pending", heartbeat_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not claimed:
+            db.session.rollback()
+            return job
+        db.session.commit()
+    db.session.refresh(job)
+
+    def worker(job_id):
+        with app.app_context():
+            try:
+                run_branch_delete(job_id)
+            except Exception:
+                app.logger.exception("Filialni o‘chirishda xatolik (job %s)", job_id)
+
+    threading.Thread(target=worker, args=(job.id,), daemon=True, name=f"branch-delete-{job.id}").start()
+    return job
+
+
+def clone_branch_products(source_id, target_id, overrides=None, workers=QR_WORKERS):
+    """
+    Manba filial mahsulotlarini nishon filialga ko'chiradi; yangi mahsulotlar sonini qaytaradi.
+
+    `overrides`: {manba_product_id: {maydon: qiymat}} — ayrim mahsulotlar uchun farqli qiymatlar.
+    Avval shu filialga klonlangan mahsulotlar qayta ko'chirilmaydi. Request konteksti
+    ichida chaqiriladi (QR dagi to'liq URL uchun).
+    """
+    from app import _product_entry_url, _upload_qr, _qr_url, QR_STORE_R2
+
+    if source_id == target_id:
+        raise ValueError("Filialni o‘zining ichiga nusxalab bo‘lmaydi")
+    overrides = overrides or {}
+    if not isinstance(overrides, dict) or not all(isinstance(v, dict) for v in overrides.values()):
+        raise ValueError('overrides: {"<manba_product_id>": {"maydon": "qiymat"}} ko‘rinishidagi obyekt bo‘lishi kerak')
+    try:
+        overrides = {int(k): v for k, v in overrides.items()}
+    except (TypeError, ValueError):
+        raise ValueError("overrides kalitlari mahsulot id (son) bo‘lishi kerak")
+    for fields in overrides.values():
+        unknown = set(fields) - CLONE_OVERRIDE_FIELDS
+        if unknown:
+            raise ValueError(f"Noma’lum maydon: {', '.join(sorted(unknown))}")
+        invalid = [field for field, value in fields.items() if value is not None and not isinstance(value, str)]
+        if invalid:
+            raise ValueError(f"Qiymat matn (yoki null) bo‘lishi kerak: {', '.join(sorted(invalid))}")
+
+    table = Product.__table__
+    copied = [c.name for c in table.columns if c.name not in CLONE_RESET_COLUMNS]
+    now = datetime.utcnow()
+
+    already = aliased(Product)
+    source = (
+        select(
+            literal(target_id), Product.id, literal(0), literal(1), literal(now), literal(now),
+            *[table.c[name] for name in copied],
+        )
+        .where(Product.branch_id == source_id)
+        .where(~exists().where(already.branch_id == target_id, already.cloned_from_id == Product.id))
+        .order_by(Product.id)
+    )
+    db.session.execute(
+        insert(table).from_select(
+            ["branch_id", "cloned_from_id", "views", "version", "created_at", "updated_at", *copied],
+            source,
+        )
+    )
+
+    new_rows = db.session.execute(
+        select(Product.id, Product.cloned_from_id)
+        .where(Product.branch_id == target_id, Product.qr_code.is_(None), Product.cloned_from_id.isnot(None))
+    ).all()
+
+    # Ayrim mahsulotlar uchun farqli qiymatlar (ORM orqali — section_lines ham yangilanadi)
+    for product_id, source_product_id in new_rows:
+        fields = overrides.get(source_product_id)
+        if fields:
+            product = db.session.get(Product, product_id)
+            for field, value in fields.items():
+                setattr(product, field, value)
+    db.session.commit()
+
+    # QR kodlar filialga xos (branch_id URL ichida): rasmlar jarayonlarda, yuklash oqimlarda
+    product_ids = [product_id for product_id, _ in new_rows]
+    if not product_ids:
+        return 0
+    if QR_STORE_R2:
+        urls = [_product_entry_url(target_id, product_id) for product_id in product_ids]
+        # fork emas, spawn: web worker ichida fon oqimlari (live-stats, SQLite yozuvchisi,
+        # isitish, analitika) ushlab turgan qulflar bola jarayonga o'tib qolmasin
+        with ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn")) as cpu_pool:
+            pngs = list(cpu_pool.map(qr_render.png_bytes, urls, chunksize=64))
+        with ThreadPoolExecutor(max_workers=workers) as io_pool:
+            qr_urls = list(io_pool.map(_upload_qr, product_ids, pngs))
+    else:
+        qr_urls = [_qr_url(target_id, product_id) for product_id in product_ids]
+
+    db.session.execute(
+        update(table).where(table.c.id == bindparam("pid")).values(qr_code=bindparam("qr")),
+        [{"pid": product_id, "qr": qr} for product_id, qr in zip(product_ids, qr_urls)],
+    )
+    db.session.commit()
+    return len(new_rows)
@@ -0,0 +1,234 @@
+"""
+Filial katalogi va skanlarini NDJSON / CSV ko'rinishida oqim (stream) bilan eksport qilish.
+
+Qatorlar `yield_per` orqali bo'laklab o'qiladi (PostgreSQL da server-side cursor),
+javob esa bo'laklab yuboriladi — xotira sarfi qatorlar soniga bog'liq emas.
+
+HTTP:
+    /admin/branch/<id>/export/products.ndjson?lang=uz,ru&fields=name,usage&gzip=1
+    /admin/branch/<id>/export/scans.csv?from=2025-01-01&to=2025-02-01
+CLI:
+    flask export products <branch_id> --format csv --lang uz -o products.csv
+    flask export scans <branch_id> --from 2025-01-01 --to 2025-02-01 --gzip -o scans.ndjson.gz
+"""
+import csv
+import io
+import json
+import sys
+import zlib
+from datetime import datetime, date, timedelta
+
+import click
+from flask import Blueprint, Response, abort, request, stream_with_context
+from sqlalchemy import select
+
+from auth import admin_required
+from models import db, Branch, Product, LanguageView
+
+export_bp = Blueprint('export', __name__)
+
+LANGS = ["uz", "ru", "en"]
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+# Tilga bog'liq bo'lmagan ustunlar
+BASE_COLUMNS = ["id", "branch_id", "image", "qr_code", "views", "last_scanned_at", "created_at", "updated_at"]
+# Uch tilli maydonlar (<field>_uz, <field>_ru, <field>_en)
+LANG_FIELDS = [
+    "name", "description", "for_whom", "components", "company", "usage", "not_usage",
+    "storage", "expiry", "certificate", "promotion", "conclusion", "country", "location",
+]
+SCAN_COLUMNS = ["id", "product_id", "lang", "created_at"]
+
+YIELD_PER = 1000
+CHUNK_SIZE = 64 * 1024
+
+
+def product_columns(langs=None, fields=None):
+    langs = langs or LANGS
+    fields = fields or LANG_FIELDS
+    unknown = [v for v in langs if v not in LANGS] + [v for v in fields if v not in LANG_FIELDS]
+    if unknown:
+        raise ValueError(f"Noma’lum til yoki maydon: {', '.join(unknown)}")
+    return BASE_COLUMNS + [f"{field}_{lang}" for field in fields for lang in langs]
+
+
+def iter_products(branch_id, columns):
+    stmt = (
+        select(*[getattr(Product, c) for c in columns])
+        .where(Product.branch_id == branch_id)
+        .order_by(Product.id)
+        .execution_options(yield_per=YIELD_PER)
+    )
+    for row in db.session.execute(stmt):
+        yield row
+
+
+def iter_scans(branch_id, date_from=None, date_to=None):
+    stmt = (
+        select(LanguageView.id, LanguageView.product_id, LanguageView.lang, LanguageView.created_at)
+        .join(Product, Product.id == LanguageView.product_id)
+        .where(Product.branch_id == branch_id)
+    )
+    if date_from:
+        stmt = stmt.where(LanguageView.created_at >= date_from)
+    if date_to:
+        # `to` sanasi ham kiradi
+        stmt = stmt.where(LanguageView.created_at < date_to + timedelta(days=1))
+    stmt = stmt.order_by(LanguageView.id).execution_options(yield_per=YIELD_PER)
+    for row in db.session.execute(stmt):
+        yield row
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def encode_rows(rows, columns, fmt):
+    """Qatorlarni ~CHUNK_SIZE hajmli matn bo'laklariga aylantiradi."""
+    buf = io.StringIO()
+    writer = csv.writer(buf) if fmt == "csv" else None
+    if writer:
+        writer.writerow(columns)
+
+    for row in rows:
+        if writer:
+            writer.writerow([_json_value(v) for v in row])
+        else:
+            buf.write(json.dumps({c: _json_value(v) for c, v in zip(columns, row)}, ensure_ascii=False))
+            buf.write("\n")
+        if buf.tell() >= CHUNK_SIZE:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31 = gzip sarlavhasi bilan
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _encoded(chunks, use_gzip):
+    chunks = (c.encode("utf-8") for c in chunks)
+    return gzip_chunks(chunks) if use_gzip else chunks
+
+
+def _parse_date(value):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise ValueError(f"Sana formati noto‘g‘ri: {value} (YYYY-MM-DD)")
+
+
+def _split_arg(value):
+    return [v.strip() for v in value.split(",") if v.strip()] if value else None
+
+
+def _stream_response(chunks, filename, fmt, use_gzip):
+    if use_gzip:
+        filename += ".gz"
+    return Response(
+        stream_with_context(_encoded(chunks, use_gzip)),
+        mimetype="application/gzip" if use_gzip else FORMATS[fmt],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Accel-Buffering": "no",  # nginx javobni buferlamasin
+        },
+    )
+
+
+# -----------------------------
+# HTTP
+# -----------------------------
+@export_bp.route('/admin/branch/<int:branch_id>/export/products.<fmt>')
+@admin_required
+def export_products(branch_id, fmt):
+    if fmt not in FORMATS:
+        abort(404)
+    branch = Branch.query.get_or_404(branch_id)
+    try:
+        columns = product_columns(_split_arg(request.args.get("lang")), _split_arg(request.args.get("fields")))
+    except ValueError as e:
+        abort(400, str(e))
+
+    chunks = encode_rows(iter_products(branch.id, columns), columns, fmt)
+    return _stream_response(chunks, f"branch_{branch.id}_products.{fmt}", fmt, request.args.get("gzip") == "1")
+
+
+@export_bp.route('/admin/branch/<int:branch_id>/export/scans.<fmt>')
+@admin_required
+def export_scans(branch_id, fmt):
+    if fmt not in FORMATS:
+        abort(404)
+    branch = Branch.query.get_or_404(branch_id)
+    try:
+        date_from = _parse_date(request.args.get("from"))
+        date_to = _parse_date(request.args.get("to"))
+    except ValueError as e:
+        abort(400, str(e))
+
+    chunks = encode_rows(iter_scans(branch.id, date_from, date_to), SCAN_COLUMNS, fmt)
+    return _stream_response(chunks, f"branch_{branch.id}_scans.{fmt}", fmt, request.args.get("gzip") == "1")
+
+
+# -----------------------------
+# CLI
+# -----------------------------
+def _write_output(chunks, output, use_gzip):
+    out = open(output, "wb") if output else sys.stdout.buffer
+    try:
+        for data in _encoded(chunks, use_gzip):
+            out.write(data)
+    finally:
+        if output:
+            out.close()
+
+
+@export_bp.cli.command("products")
+@click.argument("branch_id", type=int)
+@click.option("--format", "fmt", type=click.Choice(list(FORMATS)), default="ndjson", show_default=True)
+@click.option("--lang", help="Tillar, vergul bilan: uz,ru")
+@click.option("--fields", help="Maydonlar, vergul bilan: name,usage")
+@click.option("--gzip", "use_gzip", is_flag=True, help="gzip bilan siqish")
+@click.option("-o", "--output", type=click.Path(dir_okay=False), help="Fayl (standart: stdout)")
+def export_products_command(branch_id, fmt, lang, fields, use_gzip, output):
+    """Filial mahsulotlarini eksport qilish."""
+    branch = db.session.get(Branch, branch_id)
+    if branch is None:
+        raise click.ClickException("Filial topilmadi")
+    try:
+        columns = product_columns(_split_arg(lang), _split_arg(fields))
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    _write_output(encode_rows(iter_products(branch.id, columns), columns, fmt), output, use_gzip)
+
+
+@export_bp.cli.command("scans")
+@click.argument("branch_id", type=int)
+@click.option("--from", "date_from", help="Boshlanish sanasi (YYYY-MM-DD)")
+@click.option("--to", "date_to", help="Tugash sanasi, kiradi (YYYY-MM-DD)")
+@click.option("--format", "fmt", type=click.Choice(list(FORMATS)), default="ndjson", show_default=True)
+@click.option("--gzip", "use_gzip", is_flag=True, help="gzip bilan siqish")
+@click.option("-o", "--output", type=click.Path(dir_okay=False), help="Fayl (standart: stdout)")
+def export_scans_command(branch_id, date_from, date_to, fmt, use_gzip, output):
+    """Filial skanlarini (LanguageView) sana oralig'i bo'yicha eksport qilish."""
+    branch = db.session.get(Branch, branch_id)
+    if branch is None:
+        raise click.ClickException("Filial topilmadi")
+    try:
+        date_from, date_to = _parse_date(date_from), _parse_date(date_to)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    _write_output(encode_rows(iter_scans(branch.id, date_from, date_to), SCAN_COLUMNS, fmt), output, use_gzip)
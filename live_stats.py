@@ -0,0 +1,260 @@
+"""
+Statistika sahifasi uchun jonli yangilanishlar (server-sent events).
+
+Skan yozilgan joylar (`app._count_view`, `asgi.product_detail`) `publish()` ni
+chaqiradi. Filial bo'yicha `BranchFeed` hodisalarni yig'adi va bitta fon oqimi
+har LIVE_STATS_INTERVAL soniyada holatni yangilab, o'zgargan ko'rsatkichlarni
+shu filialning barcha ochiq sahifalariga tarqatadi — nechta admin kuzatmasin,
+hisob bitta. Hech kim kuzatmayotgan filial hodisalari darhol tashlanadi.
+
+Xabarlar faqat o'zgargan ko'rsatkichlarni (mutlaq qiymatda) olib keladi; yangi
+ulangan yoki navbati to'lib xabar yo'qotgan klient keyingi safar to'liq holatni oladi.
+
+Pub/sub har bir worker xotirasida: boshqa workerlarga tushgan skanlar har
+LIVE_STATS_RESYNC soniyada bazadan qayta o'qish orqali qo'shiladi.
+Flask yo'lida (`hub.stream`) har bir ochiq sahifa bitta oqimni band qiladi —
+gunicorn'da `--worker-class gthread` bilan ishga tushiring. ASGI rejimida
+(asgi.py) oqim Starlette'ning o'z yo'lida `hub.astream` orqali beriladi va
+a2wsgi oqimlarini egallamaydi.
+"""
+import asyncio
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import select, func
+
+from models import db, Product, LanguageView
+
+logger = logging.getLogger(__name__)
+
+INTERVAL = float(os.getenv("LIVE_STATS_INTERVAL", 1.0))
+RESYNC_SECONDS = float(os.getenv("LIVE_STATS_RESYNC", 30))
+HEARTBEAT_SECONDS = 15
+SUBSCRIBER_QUEUE = 32
+LANGS = ["uz", "ru", "en"]
+
+
+def _product_name(name_uz, name_ru, name_en, product_id):
+    # Default nom (uz > ru > en) — branch_stats dagi kabi
+    return name_uz or name_ru or name_en or f"Product {product_id}"
+
+
+class BranchFeed:
+    def __init__(self, branch_id):
+        self.branch_id = branch_id
+        self.subscribers = set()
+        self.fresh = set()  # hali to'liq holatni olmagan obunachilar
+        self.pending = []
+        self.views = None  # product_id -> views; None — holat hali yuklanmagan
+        self.names = {}
+        self.langs = Counter()
+        self.today = None
+        self.today_count = 0
+        self.synced_at = 0
+        self.last = {}
+
+    def load(self):
+        """Holatni bazadan to'liq o'qiydi (filial uchun 3 ta so'rov)."""
+        rows = db.session.execute(
+            select(Product.id, Product.views, Product.name_uz, Product.name_ru, Product.name_en)
+            .where(Product.branch_id == self.branch_id)
+        ).all()
+        self.views = {r.id: r.views or 0 for r in rows}
+        self.names = {r.id: _product_name(r.name_uz, r.name_ru, r.name_en, r.id) for r in rows}
+
+        scans = select(LanguageView.lang, LanguageView.created_at).join(
+            Product, Product.id == LanguageView.product_id
+        ).where(Product.branch_id == self.branch_id).subquery()
+        self.langs = Counter(dict(
+            db.session.execute(select(scans.c.lang, func.count()).group_by(scans.c.lang)).all()
+        ))
+        self.today = datetime.utcnow().date()
+        self.today_count = db.session.execute(
+            select(func.count()).select_from(scans)
+            .where(scans.c.created_at >= datetime.combine(self.today, datetime.min.time()))
+        ).scalar()
+        self.synced_at = time.monotonic()
+
+    def apply(self, events):
+        today = datetime.utcnow().date()
+        if today != self.today:
+            self.today, self.today_count = today, 0
+        for product_id, lang, at in events:
+            self.views[product_id] = self.views.get(product_id, 0) + 1
+            self.names.setdefault(product_id, f"Product {product_id}")
+            self.langs[lang] += 1
+            if at.date() == self.today:
+                self.today_count += 1
+
+    def snapshot(self):
+        top = sorted(((v, pid) for pid, v in self.views.items() if v > 0), reverse=True)[:5]
+        return {
+            "total_scans": sum(self.views.values()),
+            "new_users": sum(1 for v in self.views.values() if v == 1),
+            "repeat_users": sum(1 for v in self.views.values() if v > 1),
+            "lang_stats": {lang: self.langs.get(lang, 0) for lang in LANGS},
+            "today": {"date": self.today.strftime("%Y-%m-%d"), "count": self.today_count},
+            "top_qr": [[self.names[pid], v] for v, pid in top],
+        }
+
+
+class AsyncSubscriber:
+    """asyncio navbati: fon oqimi xabarni event loop'ga `call_soon_threadsafe` bilan beradi."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE)
+
+    def put_nowait(self, message):
+        if self.queue.full():
+            raise queue.Full
+        self.loop.call_soon_threadsafe(self._put, message)
+
+    def _put(self, message):
+        if not self.queue.full():
+            self.queue.put_nowait(message)
+
+
+def _sse(message):
+    return f"event: stats\ndata: {json.dumps(message, ensure_ascii=False)}\n\n"
+
+
+class StatsHub:
+    def __init__(self):
+        self.app = None
+        self._feeds = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    # --- skan yo'lidan (bloklamaydi) ---
+    def publish(self, branch_id, product_id, lang, at=None):
+        with self._lock:
+            feed = self._feeds.get(branch_id)
+            if feed is not None:
+                feed.pending.append((product_id, lang, at or datetime.utcnow()))
+
+    # --- SSE ulanishlari ---
+    def subscribe(self, branch_id, q=None):
+        if q is None:
+            q = queue.Queue(maxsize=SUBSCRIBER_QUEUE)
+        with self._lock:
+            feed = self._feeds.setdefault(branch_id, BranchFeed(branch_id))
+            feed.subscribers.add(q)
+            feed.fresh.add(q)
+        self._ensure_started()
+        self._wake.set()
+        return q
+
+    def unsubscribe(self, branch_id, q):
+        with self._lock:
+            feed = self._feeds.get(branch_id)
+            if feed is None:
+                return
+            feed.subscribers.discard(q)
+            feed.fresh.discard(q)
+            if not feed.subscribers:
+                del self._feeds[branch_id]
+
+    def stream(self, branch_id):
+        """SSE matn bo'laklari generatori."""
+        q = self.subscribe(branch_id)
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    message = q.get(timeout=HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield ": ping\n\n"  # proxy ulanishni yopib qo'ymasligi uchun
+                    continue
+                yield _sse(message)
+        finally:
+            self.unsubscribe(branch_id, q)
+
+    async def astream(self, branch_id):
+        """`stream` ning async varianti (Starlette / ASGI)."""
+        subscriber = self.subscribe(branch_id, AsyncSubscriber(asyncio.get_running_loop()))
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscriber.queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield _sse(message)
+        finally:
+            self.unsubscribe(branch_id, subscriber)
+
+    # --- fon oqimi ---
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._thread = threading.Thread(target=self._run, daemon=True, name="live-stats")
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            self._wake.wait(INTERVAL)
+            self._wake.clear()
+            with self._lock:
+                feeds = list(self._feeds.values())
+            for feed in feeds:
+                try:
+                    self._tick(feed)
+                except Exception:
+                    logger.exception("Filial %s statistikasini yangilab bo‘lmadi", feed.branch_id)
+
+    def _tick(self, feed):
+        with self._lock:
+            events, feed.pending = feed.pending, []
+            fresh, feed.fresh = feed.fresh, set()
+            subscribers = set(feed.subscribers)
+        if not subscribers:
+            return
+
+        if feed.views is None or time.monotonic() - feed.synced_at >= RESYNC_SECONDS:
+            with self.app.app_context():
+                feed.load()
+            db_synced = True
+        else:
+            feed.apply(events)
+            db_synced = False
+        if not (events or fresh or db_synced):
+            return
+
+        current = feed.snapshot()
+        delta = {k: v for k, v in current.items() if feed.last.get(k) != v}
+        feed.last = current
+        for q in subscribers:
+            message = current if q in fresh else delta
+            if not message:
+                continue
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                # Sekin klient: keyingi safar to'liq holat yuboriladi
+                with self._lock:
+                    if q in feed.subscribers:
+                        feed.fresh.add(q)
+
+
+hub = StatsHub()
+
+
+def init_app(app):
+    hub.app = app
+
+
+def publish(branch_id, product_id, lang):
+    hub.publish(branch_id, product_id, lang)
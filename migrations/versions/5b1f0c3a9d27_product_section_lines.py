@@ -0,0 +1,47 @@
+"""product section lines
+
+Revision ID: 5b1f0c3a9d27
+Revises: d42824fa8e21
+Create Date: 2025-10-20 10:12:31.402118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b1f0c3a9d27'
+down_revision = 'd42824fa8e21'
+branch_labels = None
+depends_on = None
+
+LINE_KEYS = [
+    f"{field}_{lang}"
+    for field in ("for_whom", "components", "usage", "not_usage", "promotion")
+    for lang in ("uz", "ru", "en")
+]
+
+
+def upgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('section_lines', sa.JSON(), nullable=True))
+
+    # Mavjud mahsulotlar uchun qatorlarni bir marta ajratib qo'yamiz
+    products = sa.table(
+        'products',
+        sa.column('id', sa.Integer()),
+        sa.column('section_lines', sa.JSON()),
+        *[sa.column(key, sa.Text()) for key in LINE_KEYS]
+    )
+    conn = op.get_bind()
+    rows = conn.execute(sa.select(products.c.id, *[products.c[key] for key in LINE_KEYS])).all()
+    for row in rows:
+        lines = {key: (getattr(row, key) or "").splitlines() for key in LINE_KEYS}
+        conn.execute(
+            products.update().where(products.c.id == row.id).values(section_lines=lines)
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_column('section_lines')
@@ -0,0 +1,62 @@
+"""cascade deletes and branch delete jobs
+
+Revision ID: 8c4e2a61f0b3
+Revises: 5b1f0c3a9d27
+Create Date: 2025-10-21 14:03:55.118734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4e2a61f0b3'
+down_revision = '5b1f0c3a9d27'
+branch_labels = None
+depends_on = None
+
+# SQLite da dastlabki FK lar nomsiz — batch rejimida shu nom bilan topiladi
+NAMING = {"fk": "%(table_name)s_%(column_0_name)s_fkey"}
+
+FOREIGN_KEYS = [
+    # (jadval, ustun, bog'langan jadval)
+    ('products', 'branch_id', 'branches'),
+    ('language_views', 'product_id', 'products'),
+]
+
+
+def _replace_fk(table, column, referred, ondelete):
+    name = f"{table}_{column}_fkey"  # PostgreSQL standart nomi
+    with op.batch_alter_table(table, naming_convention=NAMING) as batch_op:
+        batch_op.drop_constraint(name, type_='foreignkey')
+        batch_op.create_foreign_key(name, referred, [column], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    for table, column, referred in FOREIGN_KEYS:
+        _replace_fk(table, column, referred, 'CASCADE')
+
+    op.create_table('branch_delete_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('branch_id', sa.Integer(), nullable=False),
+    sa.Column('branch_name', sa.String(length=200), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('total_products', sa.Integer(), nullable=True),
+    sa.Column('deleted_products', sa.Integer(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('branch_delete_jobs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_branch_delete_jobs_branch_id'), ['branch_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('branch_delete_jobs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_branch_delete_jobs_branch_id'))
+
+    op.drop_table('branch_delete_jobs')
+
+    for table, column, referred in reversed(FOREIGN_KEYS):
+        _replace_fk(table, column, referred, None)
@@ -0,0 +1,26 @@
+"""product version
+
+Revision ID: a7d93e5c2b10
+Revises: 8c4e2a61f0b3
+Create Date: 2025-10-23 09:41:07.553902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d93e5c2b10'
+down_revision = '8c4e2a61f0b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,37 @@
+"""branch delete job: one active job per branch
+
+Revision ID: b6d2e8f1a935
+Revises: f3b8c5a1e704
+Create Date: 2025-10-29 09:41:18.552306
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6d2e8f1a935'
+down_revision = 'f3b8c5a1e704'
+branch_labels = None
+depends_on = None
+
+ACTIVE = sa.text("status IN ('pending', 'running')")
+
+
+def upgrade():
+    # Avvalgi poygada ochilgan ortiqcha faol ishlar: filial bo'yicha eng yangisi qoladi
+    op.execute(
+        "UPDATE branch_delete_jobs SET status = 'failed', error = 'Takroriy ish' "
+        "WHERE status IN ('pending', 'running') AND id NOT IN ("
+        "SELECT MAX(id) FROM branch_delete_jobs WHERE status IN ('pending', 'running') GROUP BY branch_id)"
+    )
+    with op.batch_alter_table('branch_delete_jobs', schema=None) as batch_op:
+        batch_op.create_index(
+            'uq_branch_delete_jobs_active_branch', ['branch_id'], unique=True,
+            sqlite_where=ACTIVE, postgresql_where=ACTIVE,
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('branch_delete_jobs', schema=None) as batch_op:
+        batch_op.drop_index('uq_branch_delete_jobs_active_branch')
@@ -0,0 +1,30 @@
+"""product cloned_from
+
+Revision ID: c2f81b7d4e65
+Revises: a7d93e5c2b10
+Create Date: 2025-10-24 16:27:12.730441
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2f81b7d4e65'
+down_revision = 'a7d93e5c2b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('cloned_from_id', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_products_cloned_from_id'), ['cloned_from_id'], unique=False)
+        batch_op.create_foreign_key('products_cloned_from_id_fkey', 'products', ['cloned_from_id'], ['id'], ondelete='SET NULL')
+
+
+def downgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_constraint('products_cloned_from_id_fkey', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_products_cloned_from_id'))
+        batch_op.drop_column('cloned_from_id')
@@ -0,0 +1,70 @@
+"""analytics summary tables
+
+Revision ID: e9a4d1c7b352
+Revises: c2f81b7d4e65
+Create Date: 2025-10-27 11:05:43.218604
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e9a4d1c7b352'
+down_revision = 'c2f81b7d4e65'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('scan_daily_stats',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('lang', sa.String(length=10), nullable=False),
+    sa.Column('branch_id', sa.Integer(), nullable=False),
+    sa.Column('scans', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], name='scan_daily_stats_product_id_fkey', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('day', 'product_id', 'lang')
+    )
+    with op.batch_alter_table('scan_daily_stats', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_scan_daily_stats_branch_id'), ['branch_id'], unique=False)
+
+    op.create_table('branch_scan_summary',
+    sa.Column('branch_id', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('today', sa.Integer(), nullable=False),
+    sa.Column('last_7d', sa.Integer(), nullable=False),
+    sa.Column('prev_7d', sa.Integer(), nullable=False),
+    sa.Column('last_30d', sa.Integer(), nullable=False),
+    sa.Column('uz', sa.Integer(), nullable=False),
+    sa.Column('ru', sa.Integer(), nullable=False),
+    sa.Column('en', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['branch_id'], ['branches.id'], name='branch_scan_summary_branch_id_fkey', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('branch_id')
+    )
+    op.create_table('top_product_summary',
+    sa.Column('rank', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('branch_id', sa.Integer(), nullable=False),
+    sa.Column('last_7d', sa.Integer(), nullable=False),
+    sa.Column('prev_7d', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], name='top_product_summary_product_id_fkey', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('rank')
+    )
+    op.create_table('analytics_state',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('last_view_id', sa.Integer(), nullable=False),
+    sa.Column('runs', sa.Integer(), nullable=False),
+    sa.Column('refreshed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('analytics_state')
+    op.drop_table('top_product_summary')
+    op.drop_table('branch_scan_summary')
+    with op.batch_alter_table('scan_daily_stats', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_scan_daily_stats_branch_id'))
+
+    op.drop_table('scan_daily_stats')
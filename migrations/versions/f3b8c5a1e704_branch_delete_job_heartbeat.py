@@ -0,0 +1,26 @@
+"""branch delete job heartbeat
+
+Revision ID: f3b8c5a1e704
+Revises: e9a4d1c7b352
+Create Date: 2025-10-28 10:12:36.904127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b8c5a1e704'
+down_revision = 'e9a4d1c7b352'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('branch_delete_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('branch_delete_jobs', schema=None) as batch_op:
+        batch_op.drop_column('heartbeat_at')
@@ -1,6 +1,19 @@
+import os
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import UniqueConstraint
-from datetime import datetime
+from sqlalchemy import UniqueConstraint, event, inspect
+from datetime import datetime, timedelta
+
+from translations import line_fields
+
+LINE_KEYS = [f"{field}_{lang}" for field in line_fields for lang in ("uz", "ru", "en")]
+
+# Admin formasida tahrirlanadigan uch tilli maydonlar
+EDITABLE_FIELDS = [
+    f"{field}_{lang}"
+    for field in ("name", "description", "for_whom", "components", "company", "usage", "not_usage",
+                  "storage", "expiry", "certificate", "promotion", "conclusion")
+    for lang in ("uz", "ru", "en")
+]
 
 
 db = SQLAlchemy()
@@ -13,7 +26,8 @@ class Branch(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # Filial -> mahsulotlar (relationship)
-    products = db.relationship("Product", backref="branch", lazy=True, cascade="all, delete-orphan")
+    # passive_deletes: o'chirishda mahsulotlar sessiyaga yuklanmaydi, baza ON DELETE CASCADE qiladi
+    products = db.relationship("Product", backref="branch", lazy=True, cascade="all, delete-orphan", passive_deletes=True)
 
     def __repr__(self):
         return f"<Branch {self.name}>"
@@ -23,7 +37,10 @@ class Product(db.Model):
     __tablename__ = "products"
     id = db.Column(db.Integer, primary_key=True)
 
-    branch_id = db.Column(db.Integer, db.ForeignKey("branches.id"), nullable=False)
+    branch_id = db.Column(db.Integer, db.ForeignKey("branches.id", ondelete="CASCADE"), nullable=False)
+
+    # Boshqa filialdan nusxa olingan bo'lsa — manba mahsulot
+    cloned_from_id = db.Column(db.Integer, db.ForeignKey("products.id", ondelete="SET NULL"), nullable=True, index=True)
 
     # Uch tilda nom va tavsif
     name_uz = db.Column(db.String(200))
@@ -103,11 +120,157 @@ class Product(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     views = db.Column(db.Integer, default=0)
 
+    # Optimistik blokirovka: har bir ORM tahririda oshadi (skanlar Core UPDATE bilan, tegmaydi)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
+
+    # Ro'yxat maydonlarining qatorlari, saqlashda bir marta ajratiladi:
+    # {"for_whom_uz": ["...", "..."], ...}
+    section_lines = db.Column(db.JSON, nullable=True)
+
+    def lines_for(self, key):
+        lines = (self.section_lines or {}).get(key)
+        if lines is None:
+            # Eski yozuvlar uchun (section_lines hali to'ldirilmagan)
+            lines = (getattr(self, key) or "").splitlines()
+        return lines
+
+    def refresh_section_lines(self):
+        self.section_lines = {
+            key: (getattr(self, key) or "").splitlines() for key in LINE_KEYS
+        }
+
+
+@event.listens_for(Product, "before_insert")
+def _product_before_insert(mapper, connection, product):
+    product.refresh_section_lines()
+
+
+@event.listens_for(Product, "before_update")
+def _product_before_update(mapper, connection, product):
+    # Faqat ro'yxat maydonlari o'zgarganda qayta hisoblanadi (skan paytida emas)
+    state = inspect(product)
+    if any(state.attrs[key].history.has_changes() for key in LINE_KEYS):
+        product.refresh_section_lines()
+
 class LanguageView(db.Model):
     __tablename__ = "language_views"
     id = db.Column(db.Integer, primary_key=True)
-    product_id = db.Column(db.Integer, db.ForeignKey("products.id"), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
     lang = db.Column(db.String(10), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    product = db.relationship("Product", backref="lang_views")
\ No newline at end of file
+    product = db.relationship(
+        "Product",
+        backref=db.backref("lang_views", cascade="all, delete-orphan", passive_deletes=True),
+    )
+
+
+class BranchDeleteJob(db.Model):
+    """Katta filialni fonda, bo'laklab o'chirish jarayoni."""
+    __tablename__ = "branch_delete_jobs"
+    id = db.Column(db.Integer, primary_key=True)
+    # Filial o'chirilgandan keyin ham yozuv qolishi uchun FK emas
+    branch_id = db.Column(db.Integer, nullable=False, index=True)
+    branch_name = db.Column(db.String(200))
+    status = db.Column(db.String(20), nullable=False, default="pending")  # pending / running / done / failed
+    total_products = db.Column(db.Integer, default=0)
+    deleted_products = db.Column(db.Integer, default=0)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    # Ishlayotgan oqim har bir bo'lakdan keyin yangilaydi
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+
+    ACTIVE = ("pending", "running")
+    # Filialda bir vaqtda faqat bitta faol ish bo'ladi (ikki parallel bosish ikki ish ochmasin)
+    __table_args__ = (
+        db.Index(
+            "uq_branch_delete_jobs_active_branch", "branch_id", unique=True,
+            sqlite_where=db.text("status IN ('pending', 'running')"),
+            postgresql_where=db.text("status IN ('pending', 'running')"),
+        ),
+    )
+    # Shuncha vaqt heartbeat bo'lmasa oqim o'lgan (worker qayta ishga tushgan) hisoblanadi
+    STALE_AFTER = timedelta(seconds=int(os.getenv("BRANCH_DELETE_STALE_SECONDS", 300)))
+
+    @property
+    def stale(self):
+        if self.status not in self.ACTIVE:
+            return False
+        return self.heartbeat_at is None or self.heartbeat_at < datetime.utcnow() - self.STALE_AFTER
+
+    @property
+    def percent(self):
+        if not self.total_products:
+            return 100 if self.status == "done" else 0
+        return int(self.deleted_products * 100 / self.total_products)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "branch_id": self.branch_id,
+            "branch_name": self.branch_name,
+            "status": self.status,
+            "total_products": self.total_products,
+            "deleted_products": self.deleted_products,
+            "percent": self.percent,
+            "error": self.error,
+            "stale": self.stale,
+        }
+
+
+class ScanDailyStat(db.Model):
+    """language_views ning kun × mahsulot × til bo'yicha yig'indisi (analytics.refresh to'ldiradi)."""
+    __tablename__ = "scan_daily_stats"
+    day = db.Column(db.Date, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    lang = db.Column(db.String(10), primary_key=True)
+    branch_id = db.Column(db.Integer, nullable=False, index=True)
+    scans = db.Column(db.Integer, nullable=False, default=0)
+
+
+class BranchScanSummary(db.Model):
+    """Har bir filial uchun tayyor ko'rsatkichlar (analytics sahifasi shu jadvaldan o'qiydi)."""
+    __tablename__ = "branch_scan_summary"
+    branch_id = db.Column(db.Integer, db.ForeignKey("branches.id", ondelete="CASCADE"), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    today = db.Column(db.Integer, nullable=False, default=0)
+    last_7d = db.Column(db.Integer, nullable=False, default=0)
+    prev_7d = db.Column(db.Integer, nullable=False, default=0)
+    last_30d = db.Column(db.Integer, nullable=False, default=0)
+    uz = db.Column(db.Integer, nullable=False, default=0)
+    ru = db.Column(db.Integer, nullable=False, default=0)
+    en = db.Column(db.Integer, nullable=False, default=0)
+
+    @property
+    def growth(self):
+        """Haftalik o'sish, foizda (oldingi haftada skan bo'lmasa None)."""
+        if not self.prev_7d:
+            return None
+        return round((self.last_7d - self.prev_7d) * 100 / self.prev_7d, 1)
+
+    def lang_percent(self, lang):
+        langs_total = self.uz + self.ru + self.en
+        return round(getattr(self, lang) * 100 / langs_total) if langs_total else 0
+
+
+class TopProductSummary(db.Model):
+    """Butun tarmoq bo'yicha oxirgi 7 kunning eng ko'p skan qilingan mahsulotlari."""
+    __tablename__ = "top_product_summary"
+    rank = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    branch_id = db.Column(db.Integer, nullable=False)
+    last_7d = db.Column(db.Integer, nullable=False, default=0)
+    prev_7d = db.Column(db.Integer, nullable=False, default=0)
+
+    product = db.relationship("Product")
+
+
+class AnalyticsState(db.Model):
+    """Yig'indi jadvallar qaysi language_views.id gacha yangilangani (bitta qator)."""
+    __tablename__ = "analytics_state"
+    id = db.Column(db.Integer, primary_key=True)
+    last_view_id = db.Column(db.Integer, nullable=False, default=0)
+    runs = db.Column(db.Integer, nullable=False, default=0)
+    refreshed_at = db.Column(db.DateTime, nullable=True)
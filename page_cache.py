@@ -0,0 +1,70 @@
+"""
+Render qilingan ommaviy sahifalar uchun kichik, chegaralangan TTL kesh (har bir worker ichida).
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class PageCache:
+    def __init__(self, max_items=2048, ttl=60):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._items[key] = (time.monotonic() + (ttl or self.ttl), value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def invalidate(self, prefix):
+        """Kalitning boshi `prefix` ga teng bo'lgan yozuvlarni o'chiradi (kalitlar tuple)."""
+        with self._lock:
+            for key in [k for k in self._items if k[:len(prefix)] == prefix]:
+                del self._items[key]
+
+
+# product_detail: (branch_id, product_id, lang) -> (product.version, rendered_at, html)
+product_pages = PageCache()
+# Versiyasiz o'qishda (bot / limitdan oshgan yo'l) sahifaning eng katta yoshi, soniya
+UNVERSIONED_MAX_AGE = int(os.getenv("PAGE_CACHE_UNVERSIONED_MAX_AGE", product_pages.ttl))
+
+
+def get_product_page(branch_id, product_id, lang, version=None):
+    """Keshdagi sahifa; `version` berilsa, faqat mahsulotning shu versiyasi uchun render qilingani.
+
+    Tahrir faqat o'z workerida `invalidate` qiladi — boshqa workerlar (va ASGI jarayon)
+    eskirgan sahifani versiya mos kelmagani orqali aniqlaydi. Versiyasiz o'qish
+    esa (isitilgan sahifalar uzoqroq TTL bilan turadi) UNVERSIONED_MAX_AGE dan
+    eski sahifani bermaydi.
+    """
+    item = product_pages.get((branch_id, product_id, lang))
+    if item is None:
+        return None
+    cached_version, rendered_at, html = item
+    if version is None:
+        if time.monotonic() - rendered_at > UNVERSIONED_MAX_AGE:
+            return None
+    elif cached_version != version:
+        return None
+    return html
+
+
+def set_product_page(branch_id, product, lang, html, ttl=None):
+    product_pages.set((branch_id, product.id, lang), (product.version, time.monotonic(), html), ttl)
@@ -0,0 +1,65 @@
+"""
+Har bir til uchun product_detail shablonini `translations.product_sections`
+ro'yxatidan (sarlavhalar — `translations[til]`) bir marta yasab beradi.
+
+Natijada `product_detail_uz.html`, `product_detail_ru.html`, `product_detail_en.html`
+shablonlari paydo bo'ladi: ular `product_detail.html` dan meros oladi va
+ichida hech qanday til tekshiruvi yo'q — sarlavhalar va maydon nomlari
+allaqachon joylashtirilgan. Jinja ularni bir marta kompilyatsiya qilib keshlaydi.
+"""
+from string import Template
+
+from jinja2 import DictLoader
+from markupsafe import escape
+
+from translations import translations, product_sections
+
+LANGS = ("uz", "ru", "en")
+
+SECTION_SNIPPETS = {
+    "ul": Template(
+        '{% if product.$key %}<div class="list-group-item"><strong>$label:</strong>'
+        '<ul class="mt-2">{% for line in product.lines_for("$key") %}<li>{{ line }}</li>{% endfor %}</ul>'
+        '</div>{% endif %}\n'
+    ),
+    "ol": Template(
+        '{% if product.$key %}<div class="list-group-item"><strong>$label:</strong>'
+        '<ol class="mt-2">{% for line in product.lines_for("$key") %}<li>{{ line }}</li>{% endfor %}</ol>'
+        '</div>{% endif %}\n'
+    ),
+    "text": Template(
+        '{% if product.$key %}<div class="list-group-item"><strong>$label:</strong> {{ product.$key }}</div>{% endif %}\n'
+    ),
+    "pre": Template(
+        '{% if product.$key %}<div class="list-group-item"><strong>$label:</strong>'
+        '<p style="white-space: pre-line; color: black; font-family: \'Montserrat\'" class="mt-2">{{ product.$key }}</p>'
+        '</div>{% endif %}\n'
+    ),
+    "strong": Template(
+        '{% if product.$key %}<div class="list-group-item"><strong>{{ product.$key }}</strong></div>{% endif %}\n'
+    ),
+}
+
+PAGE = Template('''{% extends "product_detail.html" %}
+{% block product_name %}{{ product.name_$lang }}{% endblock %}
+{% block product_description %}{% if product.description_$lang %}<p style="font-size: 1.05rem; color: black">{{ product.description_$lang }}</p>{% endif %}{% endblock %}
+{% block product_sections %}
+$sections{% endblock %}
+{% block back_label %}$back{% endblock %}
+''')
+
+
+def detail_template_name(lang):
+    return f"product_detail_{lang}.html"
+
+
+def build_detail_template(lang):
+    labels = translations[lang]
+    sections = "".join(
+        SECTION_SNIPPETS[kind].substitute(key=f"{field}_{lang}", label=escape(labels.get(field, "")))
+        for field, kind in product_sections
+    )
+    return PAGE.substitute(lang=lang, sections=sections, back=escape(labels["back"]))
+
+
+loader = DictLoader({detail_template_name(lang): build_detail_template(lang) for lang in LANGS})
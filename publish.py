@@ -0,0 +1,137 @@
+"""
+Mahsulot sahifalarini statik HTML sifatida nashr qilish.
+
+PUBLISH_MODE:
+    ""      — o'chirilgan (standart), sahifalar Flask orqali beriladi
+    "r2"    — sahifalar R2 ga yuklanadi, `pages/` ostida
+    "local" — sahifalar PUBLISH_DIR ga yoziladi (nginx uchun)
+
+Har bir mahsulot uchun QR dan boshlab butun yo'l nashr qilinadi (URL + ".html"):
+    branch/<b>/product/<p>.html            — yuklash sahifasi (product_entry)
+    branch/<b>/select-language/<p>.html    — til tanlash (select_language)
+    branch/<b>/product/<p>/<lang>.html     — mahsulot sahifasi (product_detail)
+shuning uchun baza ishlamay qolsa ham xaridor skan qilib sahifani ko'radi.
+
+Statik sahifa ko'rishni o'zi hisoblamaydi — ichidagi kichik beacon
+`product_view_beacon` ga POST yuboradi (u `last_scanned_at` ni ham yangilaydi).
+Sahifalar ilova bilan bir domen ostida berilishi kerak (nginx: `try_files
+$uri.html @app;`, CDN: shu yo'llarni R2 ga yo'naltirish), shunda cookie,
+service worker va "Orqaga" havolasi ishlaydi.
+"""
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, render_template
+
+from models import db, Branch, Product
+import product_templates
+
+PUBLISH_MODE = os.getenv("PUBLISH_MODE", "").lower()
+PUBLISH_DIR = os.getenv(
+    "PUBLISH_DIR",
+    os.path.join(os.path.abspath(os.path.dirname(__file__)), "published"),
+)
+# Statik sahifalardagi havolalar uchun (admin so'rovining hosti emas)
+PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "http://localhost")
+
+
+def enabled():
+    return PUBLISH_MODE in ("r2", "local")
+
+
+def _page_paths(branch_id, product_id):
+    """{sahifa: nisbiy yo'l} — Flask URL lariga ".html" qo'shilgan ko'rinishda."""
+    folder = f"branch/{branch_id}/product/{product_id}"
+    paths = {
+        "entry": f"{folder}.html",
+        "select_language": f"branch/{branch_id}/select-language/{product_id}.html",
+    }
+    paths.update({lang: f"{folder}/{lang}.html" for lang in product_templates.LANGS})
+    return paths
+
+
+def render_product_pages(product):
+    """{sahifa: HTML} — yuklash, til tanlash va har bir til (app konteksti ichida chaqiriladi)."""
+    # Toza request: chaqiruvchi adminning sessiyasi (navbar) va flash xabarlari
+    # ommaviy sahifaga tushmasligi kerak
+    with current_app.test_request_context(base_url=PUBLIC_BASE_URL):
+        pages = {
+            "entry": render_template("loading.html", product=product, branch_id=product.branch_id),
+            "select_language": render_template("select_language.html", product=product, branch_id=product.branch_id),
+        }
+        pages.update({
+            lang: render_template(
+                product_templates.detail_template_name(lang),
+                product=product, lang=lang, branch_id=product.branch_id, static_page=True,
+            )
+            for lang in product_templates.LANGS
+        })
+        return pages
+
+
+def _write_local(rel_path, html):
+    path = os.path.join(PUBLISH_DIR, rel_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(html)
+    # nginx hech qachon yarim yozilgan faylni bermasligi uchun
+    os.replace(tmp_path, path)
+
+
+def publish_product(product):
+    if not enabled():
+        return
+
+    from app import upload_file_to_r2
+
+    paths = _page_paths(product.branch_id, product.id)
+    for page, html in render_product_pages(product).items():
+        if PUBLISH_MODE == "local":
+            _write_local(paths[page], html)
+        else:
+            folder, filename = paths[page].rsplit("/", 1)
+            upload_file_to_r2(
+                io.BytesIO(html.encode("utf-8")), filename, f"pages/{folder}",
+                content_type="text/html; charset=utf-8",
+            )
+
+
+def unpublish_product(branch_id, product_id):
+    if not enabled():
+        return
+
+    paths = _page_paths(branch_id, product_id).values()
+    if PUBLISH_MODE == "local":
+        for path in paths:
+            try:
+                os.remove(os.path.join(PUBLISH_DIR, path))
+            except FileNotFoundError:
+                pass
+    else:
+        from app import s3_client, R2_BUCKET
+
+        s3_client.delete_objects(
+            Bucket=R2_BUCKET,
+            Delete={"Objects": [{"Key": f"pages/{path}"} for path in paths]},
+        )
+
+
+def _publish_branch(app, branch_id):
+    count = 0
+    with app.test_request_context(base_url=PUBLIC_BASE_URL):
+        query = Product.query.filter_by(branch_id=branch_id).order_by(Product.id)
+        for product in query.yield_per(200):
+            publish_product(product)
+            count += 1
+    return count
+
+
+def rebuild_site(workers=4):
+    """Barcha filiallarni parallel ravishda qayta nashr qiladi; {branch_id: soni} qaytaradi."""
+    app = current_app._get_current_object()
+    branch_ids = [bid for (bid,) in db.session.query(Branch.id).all()]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        counts = pool.map(lambda bid: _publish_branch(app, bid), branch_ids)
+        return dict(zip(branch_ids, counts))
@@ -0,0 +1,120 @@
+"""
+QR kod rasmlarini yaratish (request kontekstisiz, sof funksiyalar).
+
+QR matritsasi bir marta hisoblanadi (`matrix`, LRU) va PNG / SVG ga shundan
+chiziladi — har bir o'lcham yoki format uchun ma'lumot qayta kodlanmaydi.
+PNG o'lchami SIZE_STEPS ning biriga (yuqoriga) yaxlitlanadi va tayyor baytlar
+chegaralangan LRU da saqlanadi — ixtiyoriy `size` lar keshni siqib chiqarib,
+CPU ni band qila olmaydi. SVG vektor: kontur bir marta (LRU), o'lcham esa
+aynan so'ralganicha `width`/`height` ga yoziladi.
+
+Funksiyalar modul darajasida — ProcessPoolExecutor ularni boshqa jarayonlarda
+chaqira oladi (QR matritsasini hisoblash CPU talab qiladi, GIL tufayli oqimlar yordam bermaydi).
+"""
+import io
+import os
+from functools import lru_cache
+
+import qrcode
+from PIL import Image
+
+ERROR_LEVELS = {
+    "L": qrcode.constants.ERROR_CORRECT_L,
+    "M": qrcode.constants.ERROR_CORRECT_M,
+    "Q": qrcode.constants.ERROR_CORRECT_Q,
+    "H": qrcode.constants.ERROR_CORRECT_H,
+}
+FORMATS = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+}
+DEFAULT_ERROR = "M"
+BORDER = 4
+BOX_SIZE = 10  # qrcode.make() standarti — R2 dagi eski PNG lar bilan bir xil
+MIN_SIZE = 64
+MAX_SIZE = 4096
+SIZE_STEPS = (64, 128, 256, 512, 1024, 2048, 4096)
+
+MATRIX_CACHE_SIZE = int(os.getenv("QR_MATRIX_CACHE_SIZE", 4096))
+RENDER_CACHE_SIZE = int(os.getenv("QR_RENDER_CACHE_SIZE", 1024))
+
+
+@lru_cache(maxsize=MATRIX_CACHE_SIZE)
+def matrix(data, error=DEFAULT_ERROR):
+    """Chegara (BORDER) bilan birga modullar matritsasi: tuple[tuple[bool]]."""
+    qr = qrcode.QRCode(error_correction=ERROR_LEVELS[error], border=BORDER)
+    qr.add_data(data)
+    qr.make(fit=True)
+    return tuple(tuple(row) for row in qr.get_matrix())
+
+
+def snap_size(size):
+    """PNG uchun: `size` dan kichik bo'lmagan eng yaqin qadam (None — standart o'lcham)."""
+    if size is None:
+        return None
+    return next((step for step in SIZE_STEPS if step >= size), SIZE_STEPS[-1])
+
+
+def to_png(grid, size=None):
+    n = len(grid)
+    # Modullar butun pikselda qolishi uchun (skanerlar xira chegarani yomon o'qiydi);
+    # qolgan bir necha piksel oq chegaraga qo'shiladi — rasm aynan `size` bo'ladi
+    box = BOX_SIZE if size is None else max(1, size // n)
+    img = Image.new("1", (n, n), 1)
+    img.putdata([0 if dark else 1 for row in grid for dark in row])
+    img = img.resize((n * box, n * box), Image.NEAREST)
+    if size is not None and size > n * box:
+        canvas = Image.new("1", (size, size), 1)
+        offset = (size - n * box) // 2
+        canvas.paste(img, (offset, offset))
+        img = canvas
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+@lru_cache(maxsize=MATRIX_CACHE_SIZE)
+def svg_path(data, error=DEFAULT_ERROR):
+    """(modullar soni, <path d="…">) — o'lchamga bog'liq emas."""
+    grid = matrix(data, error)
+    n = len(grid)
+    # Qatordagi ketma-ket qora modullar bitta to'rtburchak bo'ladi — fayl ixcham
+    parts = []
+    for y, row in enumerate(grid):
+        x = 0
+        while x < n:
+            if row[x]:
+                start = x
+                while x < n and row[x]:
+                    x += 1
+                parts.append(f"M{start},{y}h{x - start}v1h-{x - start}z")
+            else:
+                x += 1
+    return n, "".join(parts)
+
+
+def to_svg(data, error=DEFAULT_ERROR, size=None):
+    n, path = svg_path(data, error)
+    pixels = n * BOX_SIZE if size is None else size
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{pixels}" height="{pixels}" '
+        f'viewBox="0 0 {n} {n}" shape-rendering="crispEdges">'
+        f'<rect width="{n}" height="{n}" fill="#fff"/>'
+        f'<path d="{path}" fill="#000"/></svg>'
+    ).encode("utf-8")
+
+
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def _png(data, size, error):
+    return to_png(matrix(data, error), size)
+
+
+def render(data, fmt="png", size=None, error=DEFAULT_ERROR):
+    if fmt == "svg":
+        return to_svg(data, error, size)
+    return _png(data, snap_size(size), error)
+
+
+def png_bytes(data):
+    return render(data, "png")
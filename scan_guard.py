@@ -0,0 +1,99 @@
+"""
+Skan yozish yo'lini (views, LanguageView, last_scanned_at) botlar va
+haddan tashqari so'rovlardan himoyalash.
+
+`check()` yozuvni o'tkazib yuborish sababini qaytaradi (yoki None):
+  "bot"          — ma'lum bot / link-preview / skript User-Agent
+  "no_js"        — klient loading.html dagi JS ni hech qachon bajarmagan (js_ok cookie yo'q)
+  "rate_limited" — IP yoki user_id bo'yicha token bucket bo'sh
+
+Sahifa baribir beriladi (keshdan), faqat bazaga yozilmaydi.
+`check()` tokenni sarflamaydi (faqat qarab chiqadi) — token `take()` orqali
+faqat yozuv haqiqatan bajariladigan joyda (bir skan — bitta token) olinadi.
+Token bucketlar har bir worker xotirasida saqlanadi, ya'ni umumiy limit
+taxminan `limit × workerlar soni`.
+"""
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+JS_COOKIE = "js_ok"
+
+BOT_UA_RE = re.compile(
+    r"bot|crawl|spider|slurp|preview|headless|phantom|lighthouse|"
+    r"facebookexternalhit|whatsapp|embedly|"
+    r"curl|wget|httpie|python-requests|python-urllib|aiohttp|httpx|go-http-client|"
+    r"okhttp|java/|libwww|node-fetch|axios",
+    re.IGNORECASE,
+)
+
+
+class TokenBucketLimiter:
+    """Kalit bo'yicha token bucket: `rate` token/soniya, eng ko'pi `burst` token."""
+
+    def __init__(self, rate, burst, max_keys=50000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _tokens(self, key, now):
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        return min(self.burst, tokens + (now - updated) * self.rate)
+
+    def peek(self, key, cost=1):
+        """Token yetarlimi — sarflamasdan."""
+        with self._lock:
+            return self._tokens(key, time.monotonic()) >= cost
+
+    def allow(self, key, cost=1):
+        now = time.monotonic()
+        with self._lock:
+            tokens = self._tokens(key, now)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            # Eng eski (uzoq vaqt ko'rinmagan) kalitlarni tashlab yuboramiz
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return allowed
+
+
+# Do'konda ko'p xaridor bitta IP (Wi-Fi / operator NAT) dan kelishi mumkin — IP limiti kengroq
+ip_limiter = TokenBucketLimiter(
+    rate=float(os.getenv("SCAN_IP_RATE", 1.0)),
+    burst=float(os.getenv("SCAN_IP_BURST", 60)),
+)
+user_limiter = TokenBucketLimiter(
+    rate=float(os.getenv("SCAN_USER_RATE", 0.2)),
+    burst=float(os.getenv("SCAN_USER_BURST", 10)),
+)
+
+
+def is_bot(user_agent):
+    return not user_agent or bool(BOT_UA_RE.search(user_agent))
+
+
+def check(ip, user_id, user_agent, js_verified):
+    if is_bot(user_agent):
+        return "bot"
+    if not js_verified:
+        return "no_js"
+    if not (ip_limiter.peek(f"ip:{ip}") and user_limiter.peek(f"user:{user_id}")):
+        return "rate_limited"
+    return None
+
+
+def take(ip, user_id):
+    """Yozuv oldidan bir token oladi; limit tugagan bo'lsa "rate_limited"."""
+    # Ikkala bucket ham tekshiriladi (biri bo'sh bo'lsa ham ikkinchisidan token olinadi)
+    ip_ok = ip_limiter.allow(f"ip:{ip}")
+    user_ok = user_limiter.allow(f"user:{user_id}")
+    if not (ip_ok and user_ok):
+        return "rate_limited"
+    return None
@@ -0,0 +1,173 @@
+"""
+Bitta serverli (SQLite) o'rnatishlar uchun rejim.
+
+DATABASE_URL sqlite bo'lsa avtomatik yoqiladi:
+  * har bir ulanishda PRAGMA lar: WAL jurnali, busy_timeout, synchronous=NORMAL,
+    mmap va cache hajmi — o'quvchilar yozuvchini kutmaydi;
+  * skan yozuvlari (views, LanguageView, last_scanned_at) so'rov ichida commit
+    qilinmaydi — `ScanWriter` fon oqimiga navbat orqali beriladi va u ularni
+    SQLITE_WRITE_WINDOW_MS oralig'ida yig'ib, bitta tranzaksiyada yozadi;
+  * vaqti-vaqti bilan `wal_checkpoint(TRUNCATE)` — WAL fayli cheksiz o'smaydi.
+
+Har bir gunicorn worker o'z yozuvchisiga ega; yozuvlar bo'laklangani uchun
+SQLite yozish qulfi uchun raqobat keskin kamayadi, qolganini busy_timeout hal qiladi.
+Jarayon kutilmaganda to'xtasa, navbatdagi (hali yozilmagan) skanlar yo'qoladi.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import event, insert, update, func, text
+
+from models import db, Product, LanguageView
+
+logger = logging.getLogger(__name__)
+
+BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", 64 * 1024))
+WRITE_WINDOW_MS = int(os.getenv("SQLITE_WRITE_WINDOW_MS", 200))
+WRITE_BATCH_MAX = int(os.getenv("SQLITE_WRITE_BATCH_MAX", 1000))
+CHECKPOINT_INTERVAL = int(os.getenv("SQLITE_CHECKPOINT_INTERVAL", 300))
+
+PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA mmap_size={MMAP_SIZE}",
+    f"PRAGMA cache_size=-{CACHE_SIZE_KB}",
+    "PRAGMA temp_store=MEMORY",
+]
+
+
+def is_sqlite(engine):
+    return engine.url.get_backend_name() == "sqlite"
+
+
+def _set_pragmas(dbapi_conn, connection_record):
+    cursor = dbapi_conn.cursor()
+    for pragma in PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+def install_pragmas(engine):
+    """Sinxron engine (yoki async engine'ning `.sync_engine`) ga PRAGMA larni ulaydi."""
+    event.listen(engine, "connect", _set_pragmas)
+
+
+class ScanWriter:
+    """Skanlarni navbatga oladi va bitta fon oqimida, bo'laklab yozadi."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._last_checkpoint = time.monotonic()
+
+    # --- navbatga qo'yish (so'rov oqimidan, bloklamaydi) ---
+    def record_view(self, product_id, lang):
+        self._ensure_started()
+        self._queue.put(("view", product_id, lang, datetime.utcnow()))
+
+    def touch(self, product_id):
+        # select_language: faqat last_scanned_at (mahalliy vaqt, avvalgidek)
+        self._ensure_started()
+        self._queue.put(("touch", product_id, None, datetime.now()))
+
+    # --- fon oqimi ---
+    def _ensure_started(self):
+        # gunicorn --preload: fork'dan keyin har bir worker o'z oqimini ochadi
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._thread = threading.Thread(target=self._run, daemon=True, name="sqlite-scan-writer")
+                self._thread.start()
+                self._pid = os.getpid()
+                atexit.register(self.stop)
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _drain(self):
+        try:
+            batch = [self._queue.get(timeout=1)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + WRITE_WINDOW_MS / 1000
+        while len(batch) < WRITE_BATCH_MAX:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._drain()
+            if batch:
+                try:
+                    self.write_batch(batch)
+                except Exception:
+                    logger.exception("%d ta skanni yozib bo‘lmadi", len(batch))
+            if time.monotonic() - self._last_checkpoint >= CHECKPOINT_INTERVAL:
+                self.checkpoint()
+
+    def write_batch(self, batch):
+        views = Counter()
+        last_seen = {}
+        lang_rows = []
+        for kind, product_id, lang, at in batch:
+            last_seen[product_id] = max(at, last_seen.get(product_id, at))
+            if kind == "view":
+                views[product_id] += 1
+                lang_rows.append({"product_id": product_id, "lang": lang, "created_at": at})
+
+        with self.engine.begin() as conn:
+            for product_id, at in last_seen.items():
+                # Skan mahsulot mazmunini o'zgartirmaydi — updated_at tegilmaydi
+                values = {"last_scanned_at": at, "updated_at": Product.updated_at}
+                if views[product_id]:
+                    values["views"] = func.coalesce(Product.views, 0) + views[product_id]
+                conn.execute(update(Product).where(Product.id == product_id).values(**values))
+            if lang_rows:
+                conn.execute(insert(LanguageView), lang_rows)
+
+    def checkpoint(self):
+        self._last_checkpoint = time.monotonic()
+        try:
+            with self.engine.connect() as conn:
+                conn.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+        except Exception:
+            logger.exception("WAL checkpoint bajarilmadi")
+
+
+scan_writer = None
+
+
+def init_app(app):
+    """SQLite bo'lsa PRAGMA larni ulaydi va skan yozuvchisini yaratadi (oqim birinchi skanda ochiladi)."""
+    global scan_writer
+    with app.app_context():
+        engine = db.engine
+    if not is_sqlite(engine):
+        return
+
+    install_pragmas(engine)
+    if os.getenv("SQLITE_SCAN_WRITER", "1") != "0":
+        scan_writer = ScanWriter(engine)
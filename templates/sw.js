@@ -0,0 +1,203 @@
+// QR INFO service worker — app tomonidan /sw.js manzilida beriladi (templates/sw.js)
+const VERSION = "{{ version }}";
+const STATIC_CACHE = `qrinfo-static-${VERSION}`;
+const PAGE_CACHE = `qrinfo-pages-${VERSION}`;
+const PRECACHE = {{ precache|tojson }};
+const PAGE_FRESH_MS = {{ page_fresh_seconds * 1000 }};
+
+const PRODUCT_PAGE_RE = /^\/branch\/(\d+)\/product\/(\d+)\/(uz|ru|en)$/;
+const PUBLIC_PAGE_RE = /^\/branch\/\d+\/(product\/\d+|select-language\/\d+)$/;
+const BEACON_RE = /^\/branch\/\d+\/product\/\d+\/(uz|ru|en)\/view$/;
+
+// -----------------------------
+// Offline ko'rishlar navbati (IndexedDB)
+// -----------------------------
+function openQueue() {
+  return new Promise((resolve, reject) => {
+    const req = indexedDB.open("qrinfo", 1);
+    req.onupgradeneeded = () => req.result.createObjectStore("views", { autoIncrement: true });
+    req.onsuccess = () => resolve(req.result);
+    req.onerror = () => reject(req.error);
+  });
+}
+
+async function queueView(url) {
+  const db = await openQueue();
+  await new Promise((resolve, reject) => {
+    const tx = db.transaction("views", "readwrite");
+    tx.objectStore("views").add({ url, at: Date.now() });
+    tx.oncomplete = resolve;
+    tx.onerror = () => reject(tx.error);
+  });
+  if (self.registration.sync) {
+    self.registration.sync.register("views").catch(() => {});
+  }
+}
+
+async function replayViews() {
+  const db = await openQueue();
+  const entries = await new Promise((resolve, reject) => {
+    const items = [];
+    const req = db.transaction("views").objectStore("views").openCursor();
+    req.onsuccess = () => {
+      const cursor = req.result;
+      if (!cursor) return resolve(items);
+      items.push({ key: cursor.key, url: cursor.value.url });
+      cursor.continue();
+    };
+    req.onerror = () => reject(req.error);
+  });
+
+  for (const { key, url } of entries) {
+    try {
+      await fetch(url, { method: "POST", credentials: "include" });
+    } catch (e) {
+      return;  // hali ham offline — keyingi safar
+    }
+    await new Promise(resolve => {
+      const tx = db.transaction("views", "readwrite");
+      tx.objectStore("views").delete(key);
+      tx.oncomplete = resolve;
+      tx.onerror = resolve;
+    });
+  }
+}
+
+async function sendView(url) {
+  try {
+    const resp = await fetch(url, { method: "POST", credentials: "include" });
+    if (resp.ok) replayViews();
+  } catch (e) {
+    await queueView(url);
+  }
+}
+
+// -----------------------------
+// Kesh yordamchilari
+// -----------------------------
+async function putWithTimestamp(cache, request, response) {
+  const headers = new Headers(response.headers);
+  headers.set("sw-cached-at", String(Date.now()));
+  const body = await response.clone().blob();
+  await cache.put(request, new Response(body, { status: response.status, statusText: response.statusText, headers }));
+}
+
+function cachedAge(response) {
+  const at = Number(response.headers.get("sw-cached-at") || 0);
+  return Date.now() - at;
+}
+
+async function staleWhileRevalidate(event, cacheName) {
+  const cache = await caches.open(cacheName);
+  const cached = await cache.match(event.request);
+  const network = fetch(event.request)
+    .then(resp => {
+      if (resp.ok || resp.type === "opaque") cache.put(event.request, resp.clone());
+      return resp;
+    })
+    .catch(() => cached);
+  if (cached) {
+    event.waitUntil(network);
+    return cached;
+  }
+  return network;
+}
+
+// Mahsulot sahifasi (stale-while-revalidate): keshda bo'lsa darhol keshdan + ko'rish beacon'i;
+// kesh PAGE_FRESH_MS dan eski bo'lsa fonda tarmoqdan yangilanadi. Tarmoqni faqat kesh bo'lmasa kutamiz.
+async function productPage(event, url) {
+  const cache = await caches.open(PAGE_CACHE);
+  const cached = await cache.match(event.request);
+  const beaconUrl = `${url.pathname}/view`;
+
+  if (cached) {
+    if (cachedAge(cached) < PAGE_FRESH_MS) {
+      event.waitUntil(sendView(beaconUrl));
+    } else {
+      // Beacon yangilangan sahifadan keyin: server (Flask) so'rovni allaqachon hisoblagan
+      // bo'lsa, sessiyadagi belgi tufayli ikkinchi marta hisoblanmaydi
+      event.waitUntil(
+        fetch(event.request)
+          .then(resp => resp.ok ? putWithTimestamp(cache, event.request, resp) : null)
+          .catch(() => {})
+          .then(() => sendView(beaconUrl))
+      );
+    }
+    return cached;
+  }
+
+  const resp = await fetch(event.request);
+  if (resp.ok) {
+    event.waitUntil(putWithTimestamp(cache, event.request, resp).then(replayViews));
+  }
+  return resp;
+}
+
+async function networkFirst(event, cacheName) {
+  const cache = await caches.open(cacheName);
+  try {
+    const resp = await fetch(event.request);
+    if (resp.ok) event.waitUntil(cache.put(event.request, resp.clone()));
+    return resp;
+  } catch (e) {
+    const cached = await cache.match(event.request);
+    if (cached) return cached;
+    throw e;
+  }
+}
+
+// -----------------------------
+// Hodisalar
+// -----------------------------
+self.addEventListener("install", event => {
+  event.waitUntil((async () => {
+    const cache = await caches.open(STATIC_CACHE);
+    // CDN fayllari boshqa domenda — no-cors (opaque) javoblar ham keshga yoziladi
+    await Promise.all(PRECACHE.map(async asset => {
+      try {
+        const req = new Request(asset, { mode: "no-cors" });
+        await cache.put(req, await fetch(req));
+      } catch (e) {}
+    }));
+    await self.skipWaiting();
+  })());
+});
+
+self.addEventListener("activate", event => {
+  event.waitUntil((async () => {
+    const keep = [STATIC_CACHE, PAGE_CACHE];
+    for (const name of await caches.keys()) {
+      if (name.startsWith("qrinfo-") && !keep.includes(name)) await caches.delete(name);
+    }
+    await self.clients.claim();
+    replayViews().catch(() => {});
+  })());
+});
+
+self.addEventListener("sync", event => {
+  if (event.tag === "views") event.waitUntil(replayViews());
+});
+
+self.addEventListener("fetch", event => {
+  const request = event.request;
+  const url = new URL(request.url);
+  const sameOrigin = url.origin === self.location.origin;
+
+  if (request.method === "POST" && sameOrigin && BEACON_RE.test(url.pathname)) {
+    // Sahifaning o'z beacon'i offline bo'lsa navbatga qo'yiladi
+    event.respondWith(fetch(request.clone()).catch(async () => {
+      await queueView(url.pathname);
+      return new Response(null, { status: 204 });
+    }));
+    return;
+  }
+  if (request.method !== "GET") return;
+
+  if (sameOrigin && PRODUCT_PAGE_RE.test(url.pathname)) {
+    event.respondWith(productPage(event, url));
+  } else if (sameOrigin && PUBLIC_PAGE_RE.test(url.pathname)) {
+    event.respondWith(networkFirst(event, PAGE_CACHE));
+  } else if (["style", "font", "image", "script"].includes(request.destination)) {
+    event.respondWith(staleWhileRevalidate(event, STATIC_CACHE));
+  }
+});
@@ -1,38 +1,67 @@
+# Mahsulot sahifasidagi matnlar; bo'lim sarlavhalari maydon nomi bilan (`product_sections`)
 translations = {
     "uz": {
         "description": "Umumiy ma'lumot",
-        "components": "Tarkibiy qismi",
+        "for_whom": "Kimlar uchun",
+        "components": "Asosiy faol tarkib",
         "company": "Ishlab chiqaruvchi",
-        "usage": "Foydalanish tartibi",
-        "not_usage": "Foydalanish mumkin bo'lmagan holatlar",
+        "usage": "Qanday ishlatiladi",
+        "not_usage": "Ehtiyot chorasi",
         "storage": "Saqlash shartlari",
         "expiry": "Yaroqlilik muddati",
-        "certificate": "Sertifikat va standartlar",
+        "certificate": "Sifat kafolati",
         "promotion": "Aksiya va bonuslar",
-        "conclusion": "Xulosa"
+        "conclusion": "Xulosa",
+        "back": "Orqaga qaytish"
     },
     "ru": {
         "description": "Общая информация",
+        "for_whom": "для кого",
         "components": "Состав",
         "company": "Производитель",
-        "usage": "Порядок использования",
+        "usage": "Применение",
         "not_usage": "Противопоказания",
         "storage": "Условия хранения",
         "expiry": "Срок годности",
         "certificate": "Сертификаты и стандарты",
         "promotion": "Акции и бонусы",
-        "conclusion": "Вывод"
+        "conclusion": "Вывод",
+        "back": "Назад"
     },
     "en": {
         "description": "General Information",
-        "components": "Composition",
+        "for_whom": "For Whom",
+        "components": "Components",
         "company": "Manufacturer",
-        "usage": "Usage Instructions",
-        "not_usage": "Contraindications",
-        "storage": "Storage Conditions",
-        "expiry": "Expiry Date",
-        "certificate": "Certificates and Standards",
-        "promotion": "Promotions and Bonuses",
-        "conclusion": "Conclusion"
+        "usage": "Usage",
+        "not_usage": "Not for usage",
+        "storage": "Storage",
+        "expiry": "Expiry",
+        "certificate": "Certificates",
+        "promotion": "Promotions",
+        "conclusion": "Conclusion",
+        "back": "Back"
     }
-}
\ No newline at end of file
+}
+
+# Mahsulot sahifasidagi bo'limlar (tartib bo'yicha): (maydon, ko'rinish).
+# Sarlavha — translations[til][maydon]. Ko'rinishlar:
+#   "ul" / "ol" — har bir qator alohida ro'yxat elementi (qatorlar saqlashda ajratiladi)
+#   "text"      — sarlavha bilan bir qatorda
+#   "pre"       — sarlavha ostida paragraf
+#   "strong"    — sarlavhasiz, qalin matn
+product_sections = [
+    ("for_whom", "ul"),
+    ("components", "ul"),
+    ("company", "text"),
+    ("usage", "ol"),
+    ("not_usage", "ul"),
+    ("storage", "pre"),
+    ("expiry", "text"),
+    ("certificate", "pre"),
+    ("promotion", "ul"),
+    ("conclusion", "strong"),
+]
+
+# Saqlashda qatorlarga ajratiladigan maydonlar
+line_fields = [field for field, kind in product_sections if kind in ("ul", "ol")]
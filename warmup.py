@@ -0,0 +1,228 @@
+"""
+Worker ishga tushganda (deploy / qayta ishga tushirish) keshlar va ulanishlarni isitish.
+
+Qadamlar, WARMUP_BUDGET_SECONDS ichida, shu tartibda:
+  1. db        — pool'da WARMUP_DB_CONNECTIONS ta ulanishni oldindan ochish;
+  2. r2        — R2 ga TLS ulanish (head_bucket);
+  3. templates — ommaviy shablonlarni kompilyatsiya qilish (product_detail_<til> ham);
+  4. pages     — har bir filial va til uchun oxirgi WARMUP_WINDOW_DAYS kunda eng ko'p
+                 skan qilingan WARMUP_TOP_N mahsulotni bitta so'rovda olib, render
+                 qilib `page_cache.product_pages` ga qo'yish.
+Vaqt tugasa qolgan qadamlar tashlab ketiladi (hisobotda "skipped").
+
+`start()` isitishni fon oqimida boshlaydi va uzog'i bilan WARMUP_BLOCK_SECONDS kutadi —
+worker (va readiness tekshiruvi) undan ko'p bloklanmaydi. Admin: /admin/warmup.
+gunicorn --preload bilan `start()` ni `post_fork` hook'ida chaqiring.
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import Blueprint, jsonify
+from sqlalchemy import select, func, text
+
+from auth import admin_required
+from models import db, Product, ScanDailyStat
+import page_cache
+import product_templates
+
+logger = logging.getLogger(__name__)
+
+warmup_bp = Blueprint('warmup', __name__)
+
+ENABLED = os.getenv("WARMUP", "1") != "0"
+BUDGET_SECONDS = float(os.getenv("WARMUP_BUDGET_SECONDS", 20))
+BLOCK_SECONDS = float(os.getenv("WARMUP_BLOCK_SECONDS", 2))
+DB_CONNECTIONS = int(os.getenv("WARMUP_DB_CONNECTIONS", 4))
+TOP_N = int(os.getenv("WARMUP_TOP_N", 20))
+WINDOW_DAYS = int(os.getenv("WARMUP_WINDOW_DAYS", 7))
+# Isitilgan sahifalar odatdagidan uzoqroq turadi (tahrirlangan mahsulot versiya orqali aniqlanadi)
+PAGE_TTL = int(os.getenv("WARMUP_PAGE_TTL", 300))
+BASE_URL = os.getenv("WARMUP_BASE_URL", "http://localhost/")
+
+PUBLIC_TEMPLATES = ["loading.html", "select_language.html", "product_detail.html", "sw.js"]
+LANGS = ["uz", "ru", "en"]
+
+_lock = threading.Lock()
+status = {"state": "idle"}
+
+
+class Budget:
+    def __init__(self, seconds):
+        self.deadline = time.monotonic() + seconds
+
+    @property
+    def left(self):
+        return self.deadline - time.monotonic()
+
+
+# -----------------------------
+# Qadamlar
+# -----------------------------
+def warm_db(app, budget):
+    engine = db.engine
+    conns = []
+    try:
+        for _ in range(DB_CONNECTIONS):
+            if budget.left <= 0:
+                break
+            conn = engine.connect()
+            conn.execute(text("SELECT 1"))
+            conns.append(conn)
+    finally:
+        # Ulanishlar yopilmaydi — pool'ga qaytadi
+        for conn in conns:
+            conn.close()
+    return {"connections": len(conns)}
+
+
+def warm_r2(app, budget):
+    from app import s3_client, R2_BUCKET
+    if not R2_BUCKET:
+        return {"skipped": "R2_BUCKET yo‘q"}
+    s3_client.head_bucket(Bucket=R2_BUCKET)
+    return {"bucket": R2_BUCKET}
+
+
+def warm_templates(app, budget):
+    names = PUBLIC_TEMPLATES + [product_templates.detail_template_name(lang) for lang in LANGS]
+    for name in names:
+        app.jinja_env.get_template(name)
+    return {"templates": len(names)}
+
+
+def hot_products(limit=TOP_N, window_days=WINDOW_DAYS):
+    """[(branch_id, product_id, lang)] — filial va til bo'yicha eng ko'p skan qilinganlar."""
+    since = datetime.utcnow().date() - timedelta(days=window_days)
+    scans = func.sum(ScanDailyStat.scans)
+    ranked = (
+        select(
+            ScanDailyStat.branch_id, ScanDailyStat.product_id, ScanDailyStat.lang,
+            func.row_number().over(
+                partition_by=(ScanDailyStat.branch_id, ScanDailyStat.lang), order_by=scans.desc()
+            ).label("rank"),
+        )
+        .where(ScanDailyStat.day > since)
+        .group_by(ScanDailyStat.branch_id, ScanDailyStat.product_id, ScanDailyStat.lang)
+        .subquery()
+    )
+    rows = db.session.execute(
+        select(ranked.c.branch_id, ranked.c.product_id, ranked.c.lang).where(ranked.c.rank <= limit)
+    ).all()
+    if rows:
+        return [tuple(r) for r in rows]
+
+    # Analitika yig'indilari hali yo'q: oynada skan qilinganlar ichidan Product.views bo'yicha, barcha tillar
+    ranked = select(
+        Product.branch_id, Product.id,
+        func.row_number().over(
+            partition_by=Product.branch_id,
+            order_by=(Product.views.desc().nulls_last(), Product.id),
+        ).label("rank"),
+    ).where(Product.last_scanned_at >= datetime.utcnow() - timedelta(days=window_days)).subquery()
+    rows = db.session.execute(
+        select(ranked.c.branch_id, ranked.c.id).where(ranked.c.rank <= limit)
+    ).all()
+    return [(branch_id, product_id, lang) for branch_id, product_id in rows for lang in LANGS]
+
+
+def warm_pages(app, budget):
+    from app import _render_product_detail
+    targets = hot_products()
+    products = {}
+    ids = sorted({product_id for _, product_id, _ in targets})
+    for i in range(0, len(ids), 500):
+        for product in Product.query.filter(Product.id.in_(ids[i:i + 500])):
+            products[product.id] = product
+
+    rendered = 0
+    with app.test_request_context(base_url=BASE_URL):
+        for branch_id, product_id, lang in targets:
+            if budget.left <= 0:
+                break
+            product = products.get(product_id)
+            if product is None or product.branch_id != branch_id:
+                continue
+            html = _render_product_detail(product, lang, branch_id)
+            page_cache.set_product_page(branch_id, product, lang, html, ttl=PAGE_TTL)
+            rendered += 1
+    return {"candidates": len(targets), "rendered": rendered}
+
+
+STEPS = [
+    ("db", warm_db),
+    ("r2", warm_r2),
+    ("templates", warm_templates),
+    ("pages", warm_pages),
+]
+
+
+# -----------------------------
+# Ishga tushirish
+# -----------------------------
+def run(app, budget_seconds=BUDGET_SECONDS):
+    """Barcha qadamlarni vaqt byudjeti ichida bajaradi va hisobot qaytaradi."""
+    budget = Budget(budget_seconds)
+    report = {"state": "running", "started_at": datetime.utcnow().isoformat(), "steps": {}}
+    status.clear()
+    status.update(report)
+
+    with app.app_context():
+        try:
+            for name, step in STEPS:
+                if budget.left <= 0:
+                    report["steps"][name] = {"skipped": "vaqt tugadi"}
+                    continue
+                started = time.monotonic()
+                try:
+                    result = step(app, budget)
+                except Exception as e:
+                    # Bitta qadam xatosi qolganlariga to'sqinlik qilmaydi
+                    logger.exception("Isitish qadami %s bajarilmadi", name)
+                    result = {"error": str(e)}
+                result["ms"] = round((time.monotonic() - started) * 1000)
+                report["steps"][name] = result
+                status["steps"] = report["steps"]
+        finally:
+            db.session.remove()
+
+    report["state"] = "done"
+    report["finished_at"] = datetime.utcnow().isoformat()
+    status.update(report)
+    logger.info("Isitish tugadi: %s", report["steps"])
+    return report
+
+
+def start(app, block_seconds=BLOCK_SECONDS, force=False):
+    """Isitishni fon oqimida boshlaydi; ko'pi bilan `block_seconds` kutadi. Oqimni qaytaradi."""
+    if not (ENABLED or force):
+        return None
+    with _lock:
+        if status.get("state") == "running":
+            return None
+        status.clear()
+        status["state"] = "running"
+    thread = threading.Thread(target=run, args=(app,), daemon=True, name="warmup")
+    thread.start()
+    if block_seconds:
+        thread.join(block_seconds)
+    return thread
+
+
+# -----------------------------
+# Admin
+# -----------------------------
+@warmup_bp.route('/admin/warmup')
+@admin_required
+def warmup_status():
+    return jsonify(status)
+
+
+@warmup_bp.route('/admin/warmup', methods=['POST'])
+@admin_required
+def warmup_trigger():
+    from flask import current_app
+    started = start(current_app._get_current_object(), block_seconds=0, force=True)
+    return jsonify(status), 202 if started else 409
@@ -1,6 +1,10 @@
 from app import app
+import warmup
 
 application = app  # For WSGI servers like gunicorn/uwsgi or PythonAnywhere
 
+# Keshlar va ulanishlarni fonda isitish (ko'pi bilan WARMUP_BLOCK_SECONDS kutadi)
+warmup.start(app)
+
 if __name__ == 'main':
     app.run()
\ No newline at end of file